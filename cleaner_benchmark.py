@@ -0,0 +1,81 @@
+import time
+import random
+import pandas as pd
+from nltk.corpus import stopwords
+from githubanalyzer.cleaner import DataCleaner
+
+# Constants
+NUM_ISSUES = 1000000
+PROCESSES = 4
+FIELDS = ['title', 'body']
+WORDS = ['Error', 'when', 'running', 'build', 'the', 'webpack', 'config', 'fails', 'on', 'Windows',
+         'TypeError:', 'undefined', 'is', 'not', 'a', 'function', 'erreur', 'fehler', 'compilación', 'и']
+
+# Generate random titles and bodies
+def generate_data(num_issues):
+    rand = random.Random(0)
+    
+    def text(length):
+        return ' '.join(rand.choice(WORDS) for i in range(rand.randint(1, length)))
+    
+    return pd.DataFrame({
+        'title': [text(8) for i in range(num_issues)],
+        'body': [text(40) for i in range(num_issues)]
+    })
+
+# Filter English entries with the original word-by-word loop
+def legacy_filter_english(data, fields):
+    english = set(stopwords.words('english'))
+    is_english = dict()
+    column_names = list()
+    
+    for field in fields:
+        is_english[field] = list()
+        entries = data[field].str.split(' ')
+        
+        for text in entries:
+            word_count = 0
+            
+            for word in text:
+                if word.lower() in english: word_count += 1
+        
+            is_english[field].append(word_count > 0)
+                      
+        column_name = field + '_is_english'
+        column_names.append(column_name)
+        data.loc[:, column_name] = is_english[field]
+    
+    filtered = data.filter(items=column_names)
+    has_english = filtered.isin([True]).sum(axis=1) > 0
+    
+    data = data[has_english]
+    data = data.drop(column_names, axis=1)
+    
+    return data
+
+# Time function call
+def timed(func, *args, **kwargs):
+    start = time.time()
+    res = func(*args, **kwargs)
+    
+    return res, time.time() - start
+
+# Compare filter implementations
+def run_benchmark():
+    data = generate_data(NUM_ISSUES)
+    cleaner = DataCleaner()
+    
+    legacy, legacy_time = timed(legacy_filter_english, data.copy(), FIELDS)
+    vectorized, vectorized_time = timed(cleaner.filter_english, data, FIELDS)
+    parallel, parallel_time = timed(cleaner.filter_english, data, FIELDS, processes=PROCESSES)
+    
+    assert legacy.equals(vectorized) and legacy.equals(parallel)
+    
+    print('Rows kept: %d of %d' % (len(vectorized), len(data)))
+    print('Legacy: %.2f s' % legacy_time)
+    print('Vectorized: %.2f s (%.1fx)' % (vectorized_time, legacy_time / vectorized_time))
+    print('Parallel (%d processes): %.2f s (%.1fx)' % (PROCESSES, parallel_time, legacy_time / parallel_time))
+
+# Run application
+if __name__ == '__main__':
+    run_benchmark()
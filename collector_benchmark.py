@@ -0,0 +1,80 @@
+import time
+from githubanalyzer.collector import GitHubIssueCollector
+from githubanalyzer.asynccollector import AsyncGitHubIssueCollector
+from githubanalyzer.fakegithub import FakeGitHubServer
+from githubanalyzer.apirequest import APIRequest
+from githubanalyzer.mongodb import MongoDB
+
+# Constants
+DATABASE = 'github_benchmark'
+NUM_REPOS = 3
+ISSUES_PER_REPO = 1000
+SAMPLE_PERCENT = 25
+LATENCY = 0.05
+ERROR_RATE = 0.0
+REPLAY_DIR = None
+PACE = False
+CORE_LIMIT = 5000
+SEARCH_LIMIT = 30
+RESET_WINDOW = 3600
+MODES = {
+    'sync': (GitHubIssueCollector, {}),
+    'async': (AsyncGitHubIssueCollector, {'max_concurrency': 16}),
+    'threaded': (GitHubIssueCollector, {'comment_workers': 8}),
+    'bulk_comments': (GitHubIssueCollector, {'bulk_comments': True}),
+    'bernoulli': (GitHubIssueCollector, {'sampling': 'bernoulli', 'seed': 1})
+}
+
+# Run collector in every mode against local API server
+def run_benchmark():
+    server = FakeGitHubServer(num_repos=NUM_REPOS, issues_per_repo=ISSUES_PER_REPO, latency=LATENCY,
+                              error_rate=ERROR_RATE, core_limit=CORE_LIMIT, search_limit=SEARCH_LIMIT, 
+                              reset_window=RESET_WINDOW, replay_dir=REPLAY_DIR).start()
+    mongo = MongoDB(DATABASE)
+    results = list()
+    
+    for mode, (collector_class, options) in MODES.items():
+        server.reset_counters()
+        mongo.db.collected.drop()
+        
+        req = APIRequest(server.url, {'User-Agent': 'benchmark'}, pace=PACE)
+        collector = collector_class(req, mongo, **options)
+        
+        start = time.time()
+        collector.collect(sample_percent=SAMPLE_PERCENT)
+        collector.flush()
+        elapsed = time.time() - start
+        
+        collected = mongo.db.collected.count_documents({})
+        results.append((mode, collected, elapsed, server.total_calls(), server.calls.get('core', 0)))
+    
+    server.stop()
+    mongo.client.drop_database(DATABASE)
+    
+    print_results(results)
+# Print throughput per mode and the API budget it needs
+def print_results(results):
+    if PACE:
+        print('Rate limit pacing on (%d core calls per %d s), throughput is bound by the pacer.' % 
+              (CORE_LIMIT, RESET_WINDOW))
+    else:
+        print('Rate limit pacing off, throughput of the collector itself.')
+    
+    print('%-15s %10s %10s %12s' % ('Mode', 'Issues', 'Seconds', 'Issues/sec'))
+    
+    for mode, collected, elapsed, calls, core_calls in results:
+        print('%-15s %10d %10.2f %12.2f' % (mode, collected, elapsed, collected / elapsed))
+    
+    # Under the rate limit, core calls per issue rather than speed decide how many issues an hour allows
+    print('')
+    print('%-15s %10s %16s %18s' % ('Mode', 'Calls', 'Calls per issue', 'Issues per hour'))
+    
+    for mode, collected, elapsed, calls, core_calls in results:
+        per_issue = calls / collected if collected else 0
+        per_hour = CORE_LIMIT * 3600 / RESET_WINDOW * collected / core_calls if core_calls else 0
+        print('%-15s %10d %16.3f %18.0f' % (mode, calls, per_issue, per_hour))
+
+
+# Run application
+if __name__ == '__main__':
+    run_benchmark()
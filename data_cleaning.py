@@ -1,43 +1,98 @@
 import pandas as pd
 from githubanalyzer.cleaner import DataCleaner
 from githubanalyzer.mongodb import MongoDB
+from githubanalyzer.ingestschema import IngestSchema
+from githubanalyzer.minhash import LSHIndex
 
 # Constants
 FILE_PATH = '../data/'
 OUTPUT_FILE = FILE_PATH + 'issues_clean.json'
+STREAMING = False
+CHUNK_SIZE = 10000
+FILTER_PROCESSES = 4
+NEAR_DUPLICATES = False
+SIMILARITY_THRESHOLD = 0.8
+COLUMNS = ['id', 'title', 'body', 'issue_comments', 'html_url']
 
 # Process input and save output
 def process_data():
     mongo = MongoDB('github')
-    df = pd.DataFrame(list(mongo.get_all('collected')))
     
-    df = clean_dataset(df)
+    if STREAMING:
+        process_stream(mongo)
+        return
     
-    columns = ['id', 'title', 'body', 'issue_comments', 'html_url']
-    df = df.filter(items=columns)
+    df = pd.DataFrame(list(mongo.get_all('collected', IngestSchema().fields())))
+    
+    df = clean_dataset(df, near_duplicates=near_duplicate_index())
+    df = df.filter(items=COLUMNS)
     
     mongo.save('issues', df)
     df.to_json(OUTPUT_FILE, orient='records')
 
+# Clean collection chunk by chunk, writing each chunk as soon as it is ready
+# Chunks are bounded, but duplicate detection state still grows with the number of distinct issues
+def process_stream(mongo):
+    cursor = mongo.get_all('collected', IngestSchema().fields()).batch_size(CHUNK_SIZE)
+    cleaner = DataCleaner()
+    seen = set()
+    index = near_duplicate_index()
+    written = 0
+    
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        f.write('[')
+        
+        for chunk in cleaner.chunks(cursor, CHUNK_SIZE):
+            df = clean_dataset(chunk, seen, index)
+            df = df.filter(items=COLUMNS)
+            
+            if df.empty:
+                continue
+            
+            mongo.save('issues', df)
+            
+            f.write(',' if written > 0 else '')
+            f.write(df.to_json(orient='records')[1:-1])
+            written += len(df)
+            print('Cleaned issues: %d' % written)
+        
+        f.write(']')
+
+# Create index for near duplicate detection if enabled
+def near_duplicate_index():
+    if not NEAR_DUPLICATES:
+        return None
+    
+    return LSHIndex(SIMILARITY_THRESHOLD)
+
 # Clean data
-def clean_dataset(dataset):
+def clean_dataset(dataset, seen=None, near_duplicates=None):
     cleaner = DataCleaner()
     fields = ['title', 'body']
    
     df = cleaner.clean(dataset, fields)
-    df = remove_duplicates_no_comments(cleaner, df, fields)
-    df = cleaner.filter_english(df, fields)
+    df = remove_duplicates_no_comments(cleaner, df, fields, seen=seen, 
+                                       near_duplicates=near_duplicates)
+    df = cleaner.filter_english(df, fields, processes=FILTER_PROCESSES)
     
     return df
 
 # Remove issues with duplicate title, body and no comments
 def remove_duplicates_no_comments(cleaner, data, fields, 
-                                  duplicate_each=False):
+                                  duplicate_each=False, seen=None, near_duplicates=None):
     comments = data[data['comments'] > 0]
     no_comments = data[data['comments'] == 0]
     
-    no_comments = cleaner.remove_duplicates(no_comments, fields, 
-                                            duplicate_each=duplicate_each)
+    # Near duplicates are matched against an LSH index kept across chunks
+    if near_duplicates is not None:
+        no_comments = cleaner.remove_near_duplicates(no_comments, fields, near_duplicates)
+    # Values seen in earlier chunks are carried in a set of row hashes
+    elif seen is not None:
+        no_comments = cleaner.remove_seen(no_comments, fields, seen, 
+                                          duplicate_each=duplicate_each)
+    else:
+        no_comments = cleaner.remove_duplicates(no_comments, fields, 
+                                                duplicate_each=duplicate_each)
     
     data = pd.concat([comments, no_comments])
     
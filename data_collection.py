@@ -1,16 +1,35 @@
 import os
 import json
+from multiprocessing import Process
 from githubanalyzer.collector import GitHubIssueCollector
+from githubanalyzer.asynccollector import AsyncGitHubIssueCollector
+from githubanalyzer.shardedcollector import ShardedGitHubIssueCollector
+from githubanalyzer.workqueue import WorkQueue
+from githubanalyzer.ingestschema import IngestSchema
 from githubanalyzer.mongodb import MongoDB
 from githubanalyzer.apirequest import APIRequest
 
 # Constants
 FILE_PATH = '../data/'
 ACCESS_TOKEN = 'YOUR_GITHUB_ACCESS_TOKEN'
+ACCESS_TOKENS = [ACCESS_TOKEN]
 API_ENDPOINT = 'https://api.github.com/'
 USER_AGENT = 'CUSTOM_USER_AGENT'
 OUTPUT_FILE = FILE_PATH + 'issues.json'
 INFO_FILE = FILE_PATH + 'info.json'
+CACHE_DIR = FILE_PATH + 'http_cache/'
+COLLECTION_MODE = 'sync' # sync, async, incremental, queue, worker
+MAX_CONCURRENCY = 32
+BUFFER_SIZE = 500
+BULK_COMMENTS = False
+SAMPLING = 'index' # index, bernoulli
+SAMPLE_SEED = None
+COMMENT_WORKERS = 0
+COMPACT_STORAGE = True
+STORE_RAW = False
+NUM_WORKERS = 4
+PAGES_PER_ITEM = 50
+LEASE_TIME = 300
 HTTP_HEADERS = {
     'User-Agent': USER_AGENT, 
     'Authorization': 'token ' + ACCESS_TOKEN,
@@ -19,15 +38,69 @@ HTTP_HEADERS = {
 
 # Initialize script
 def init():
-    req = APIRequest(API_ENDPOINT, HTTP_HEADERS)
+    if COLLECTION_MODE == 'queue':
+        queue_repos()
+        return
+    
+    if COLLECTION_MODE == 'worker':
+        start_workers()
+        return
+    
+    req = APIRequest(API_ENDPOINT, HTTP_HEADERS, cache_dir=CACHE_DIR, tokens=ACCESS_TOKENS)
     mongo = MongoDB('github')
 
-    if len(get_collected(mongo)) > 0:
-        collector = GitHubIssueCollector(req, mongo, get_info())        
+    info = get_info() if len(get_collected(mongo)) > 0 else None
+    schema = ingest_schema(mongo)
+    
+    if COLLECTION_MODE == 'async':
+        collector = AsyncGitHubIssueCollector(req, mongo, info, max_concurrency=MAX_CONCURRENCY, 
+                                              checkpoint=write_info, buffer_size=BUFFER_SIZE, 
+                                              bulk_comments=BULK_COMMENTS, sampling=SAMPLING, seed=SAMPLE_SEED, 
+                                              schema=schema)
     else:
-        collector = GitHubIssueCollector(req, mongo)
-        
-    collect_data(collector)
+        collector = GitHubIssueCollector(req, mongo, info, checkpoint=write_info, buffer_size=BUFFER_SIZE, 
+                                         bulk_comments=BULK_COMMENTS, sampling=SAMPLING, seed=SAMPLE_SEED, 
+                                         comment_workers=COMMENT_WORKERS, schema=schema)
+    
+    if COLLECTION_MODE == 'incremental':
+        collector.collect_incremental()
+    else:
+        collect_data(collector)
+    
+# Get schema of stored issues
+def ingest_schema(mongo):
+    if not COMPACT_STORAGE:
+        return None
+    
+    return IngestSchema(raw_collection=mongo.db.raw_collected if STORE_RAW else None)
+
+# Create collector which shares work through the Mongo queue
+def sharded_collector():
+    req = APIRequest(API_ENDPOINT, HTTP_HEADERS, cache_dir=CACHE_DIR, tokens=ACCESS_TOKENS)
+    mongo = MongoDB('github')
+    queue = WorkQueue(mongo, lease_time=LEASE_TIME)
+    
+    return ShardedGitHubIssueCollector(req, mongo, queue, buffer_size=BUFFER_SIZE, schema=ingest_schema(mongo))
+
+# Fill work queue with repos and issue page ranges
+def queue_repos():
+    collector = sharded_collector()
+    collector.enqueue_repos(seed=SAMPLE_SEED, pages_per_item=PAGES_PER_ITEM)
+
+# Process queued work items
+def run_worker():
+    collector = sharded_collector()
+    collector.work()
+
+# Start worker processes on this host
+def start_workers():
+    workers = [Process(target=run_worker) for i in range(NUM_WORKERS)]
+    
+    for worker in workers:
+        worker.start()
+    
+    for worker in workers:
+        worker.join()
     
 # Get collection info
 def get_info():
@@ -41,36 +114,60 @@ def get_info():
 def get_collected(mongo):    
     return list(mongo.get_all('collected'))
     
-# Save collection progress
+# Write collection progress to file
+def write_info(info):
+    info = dict(info, interrupted=True, repo_sample=list(info['repo_sample']))
+    tmp_file = INFO_FILE + '.tmp'
+    
+    with open(tmp_file, 'w') as f:
+        json.dump(info, f)
+    
+    os.replace(tmp_file, INFO_FILE)
+    
+# Save collection progress along with buffered issues
 def save_progress(collector):
+    collector.flush()
     collector.info['interrupted'] = True
     collector.info['repo_sample'] = list(collector.info['repo_sample'])
-                  
-    with open(INFO_FILE, 'w') as info:
-        json.dump(collector.info, info)
             
-# Perform data collection
-def collect_data(collector, recur_level=1):
-    try:
-        collector.collect(page=collector.info['repos_page'])
-    except MemoryError:
-        print('Memory limit exceeded.')
-    except Exception as e:
-        print('Collection interrupted.')
-        print(e.args)
+# Export collected issues to file one document at a time
+def export_collected(mongo):
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        f.write('[')
         
-        save_progress(collector)
-        collect_data(collector, recur_level=recur_level+1)
+        for index, issue in enumerate(mongo.get_all('collected')):
+            if index > 0:
+                f.write(',')
+            
+            json.dump(issue, f)
+        
+        f.write(']')
+            
+# Perform data collection, resuming from saved progress after errors
+def collect_data(collector):
+    try:
+        while True:
+            try:
+                collector.collect(page=collector.info['repos_page'])
+                break
+            except MemoryError:
+                print('Memory limit exceeded.')
+                break
+            except Exception as e:
+                print('Collection interrupted.')
+                print(e.args)
+                
+                save_progress(collector)
     except:
          print('Manual interruption.')
     finally:
-        if recur_level is 1:
-            save_progress(collector)
-            
-            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:    
-                json.dump(get_collected(), f)
-            
-            print('Collection complete.')
+        save_progress(collector)
+        export_collected(collector.mongo)
+        
+        print('Collection complete.')
+        print('Response cache hits: %(hits)d, misses: %(misses)d' % collector.req.cache_stats())
+        print('Time lost to throttling: %(throttled).1f seconds' % collector.req.rate_limit_stats())
+        collector.print_usage()
     
 # Run application
 if __name__ == '__main__':
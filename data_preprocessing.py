@@ -2,10 +2,16 @@ import pandas as pd
 from githubanalyzer.preprocessor import TextPreprocessor
 from githubanalyzer.cleaner import DataCleaner
 from githubanalyzer.mongodb import MongoDB
+from githubanalyzer.tokencache import TokenCache
 
 # Constants
 FILE_PATH = '../data/'
 OUTPUT_FILE = FILE_PATH + 'issues_processed.json'
+PROCESSES = None
+CHUNK_SIZE = 1000
+METHOD = 'lemmatize'
+CACHE_FILE = FILE_PATH + 'token_cache.sqlite'
+CACHE_SIZE = 5000000
 
 # Process input and save output
 def process_data():
@@ -24,10 +30,22 @@ def process_data():
     
 # Preprocess text
 def prepare_text(dataset): 
-    processor = TextPreprocessor()
-   
-    data = processor.prepare(dataset)
-    data = [' '.join(item) for item in data]
+    processor = TextPreprocessor(METHOD)
+    cache = TokenCache(CACHE_FILE, processor.config(), max_entries=CACHE_SIZE)
+    texts = list(dataset)
+    
+    # Only texts missing from the cache go through the preprocessor
+    prepared = cache.get_many(texts)
+    missing = [text for text in dict.fromkeys(texts) if text not in prepared]
+    tokens = processor.prepare_batch(missing, processes=PROCESSES, chunk_size=CHUNK_SIZE)
+    
+    cache.set_many(zip(missing, tokens))
+    prepared.update(zip(missing, tokens))
+    
+    print('Token cache: %s' % cache.stats())
+    cache.close()
+    
+    data = [' '.join(prepared[text]) for text in texts]
     
     return data
           
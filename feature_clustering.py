@@ -1,3 +1,5 @@
+import os
+import hashlib
 import pandas as pd
 from githubanalyzer.mongodb import MongoDB
 from sklearn.externals import joblib
@@ -6,18 +8,65 @@ from sklearn.externals import joblib
 FILE_PATH = '../data/'
 CLUSTER_FILE = FILE_PATH + 'issue_clusters.json'
 CLUSTERING_MODEL_FILE = FILE_PATH + 'clustering_model.pkl'
+SCALED_FEATURES_FILE = FILE_PATH + 'scaled_features.npy'
+SVD_COMPONENTS_FILE = FILE_PATH + 'svd_components.pkl'
+SVD_ALGORITHM = 'arpack' # arpack, block
+WARM_START = True
+RANDOM_SEED = None
+CENTERS_FILE = FILE_PATH + 'cluster_centers.pkl'
+NUM_CLUSTERS = 30
+NUM_SUBCLUSTERS = 5
+MAX_CLUSTER_SIZE = 100
+N_JOBS = -1
+ALGORITHM = 'elkan'
 
 # Process input and save output
 def process_data():
     clusterer = joblib.load(CLUSTERING_MODEL_FILE)
     mongo = MongoDB('github')
+    
+    # Streaming models keep no features to scale, their clusters were assigned during extraction
+    if clusterer.is_streaming():
+        print('Model was fitted by the streaming pipeline, skipping scaling and hierarchy.')
+        return
 
-    features = clusterer.scale_data(clusterer.features, num_dimensions=100, save_features=True)
+    # Previous components seed the subspace iteration only when they were fitted on the same vocabulary
+    previous_svd = joblib.load(SVD_COMPONENTS_FILE) if WARM_START and os.path.exists(SVD_COMPONENTS_FILE) else dict()
+    vocabulary = clusterer.vocabulary_hash()
+    init = previous_svd['components'] if previous_svd.get('vocabulary') == vocabulary else None
+    output_file = SCALED_FEATURES_FILE if SVD_ALGORITHM == 'block' else None
+    
+    features = clusterer.scale_data(clusterer.features, num_dimensions=100, save_features=True, 
+                                    algorithm=SVD_ALGORITHM, random_seed=RANDOM_SEED, 
+                                    init=init, output_file=output_file)
+    
+    svd = clusterer.scale_func.named_steps['truncatedsvd']
+    joblib.dump({'components': svd.components_, 'vocabulary': vocabulary}, SVD_COMPONENTS_FILE)
+    print('Explained variance: %f' % svd.explained_variance_ratio_.sum())
+    
     sample = round((33 / 100) * features.shape[0])
     
-    clusterer.cluster(features, num_clusters=30, max_iterations=200, logging=True)
+    # Centers of the previous run only seed KMeans when the SVD started from the basis they were fitted in
+    previous = joblib.load(CENTERS_FILE) if WARM_START and os.path.exists(CENTERS_FILE) else dict()
+    
+    if init is None or SVD_ALGORITHM != 'block' or previous.get('basis') != basis_hash(init):
+        previous = dict()
+    
+    clusterer.cluster(features, num_clusters=NUM_CLUSTERS, max_iterations=200, logging=True, 
+                      init=previous.get('model'), n_jobs=N_JOBS, algorithm=ALGORITHM)
     clusterer.score_clustering(features, sample_size=sample)
     
+    clusterer.build_hierarchy(features, clusterer.clusters, num_clusters=NUM_SUBCLUSTERS, 
+                              max_cluster_size=MAX_CLUSTER_SIZE, previous=previous.get('hierarchy'), 
+                              n_jobs=N_JOBS, algorithm=ALGORITHM)
+    
+    for level, stats in sorted(clusterer.fit_summary().items()):
+        print('Level %d: %d models (%d warm started), %d iterations in %.2f s' % 
+              (level, stats['models'], stats['warm_start'], stats['iterations'], stats['time']))
+    
+    joblib.dump({'model': clusterer.model.cluster_centers_, 'hierarchy': clusterer.hierarchy_centers(), 
+                 'basis': basis_hash(svd.components_)}, CENTERS_FILE)
+    
     # Save clustering class
     clusterer.save(CLUSTERING_MODEL_FILE)
 
@@ -28,6 +77,10 @@ def process_data():
     
     mongo.assign_clusters(clusterer.clusters)
     
+# Get hash of SVD components, identifying the space cluster centers were fitted in
+def basis_hash(components):
+    return hashlib.sha1(components.tobytes()).hexdigest()
+
 # Run application        
 if __name__ == '__main__':    
     process_data()    
\ No newline at end of file
@@ -1,30 +1,46 @@
-import math
+import resource
+import itertools
 import pandas as pd
 from githubanalyzer.clusterer import DocumentClusterer
+from githubanalyzer.cleaner import DataCleaner
 from githubanalyzer.mongodb import MongoDB
 
 # Constants
 FILE_PATH = '../data/'
 OUTPUT_FILE = FILE_PATH + 'issue_clusters.json'
 CLUSTERING_MODEL_FILE = FILE_PATH + 'clustering_model.pkl'
+STREAMING = False # Separate pipeline: clusters are final, feature_clustering and assignment are skipped
+CHUNK_SIZE = 10000
+NUM_FEATURES = 2 ** 20
+NUM_CLUSTERS = 30
+BATCH_SIZE = 500
+
+# Context-specific stopwords
+STOPWORDS = ['problem', 'issue', 'help', 'bug', 'work']
 
 # Process input and save output
 def process_data():
     mongo = MongoDB('github')
-    df = pd.DataFrame(list(mongo.get_all('processed')))
     
-    # Context-specific stopwords
-    stopwords = ['problem', 'issue', 'help', 'bug', 'work']
+    if STREAMING:
+        process_stream(mongo)
+        return
+    
+    df = pd.DataFrame(list(mongo.get_all('processed')))
     
     clusterer = DocumentClusterer()
-    clusterer.extract_features(df['title'], stopwords=stopwords,
+    clusterer.extract_features(df['title'], stopwords=STOPWORDS,
                                max_freq=0.05, min_count=10, ngram_range=(1,3))
     
-    df['title'] = clusterer.features.todense().tolist()       
-    not_null = [not all(math.isclose(item, 0.0) for item in array) for array in df['title'].tolist()]
+    # Rows are filtered on the sparse matrix so memory scales with non-zero values
+    not_null = clusterer.not_null(clusterer.features)
     df = df[not_null]
     
-    clusterer.features = clusterer.remove_nulls(clusterer.features)
+    clusterer.features = clusterer.features[not_null]
+    
+    # Issues left out of the fit as empty titles or null vectors are not new to incremental assignment
+    clustered = set(df['id'])
+    clusterer.excluded = {issue['id'] for issue in mongo.get_all('issues', {'_id':0, 'id':1})} - clustered
     clusterer.save(CLUSTERING_MODEL_FILE)
     
     df = df.filter(items=['id'])
@@ -32,6 +48,54 @@ def process_data():
     mongo.save('clusters', df, needs_conversion=True)
     df.to_json(OUTPUT_FILE, orient='records')
     
+    print('Features: %d x %d (%d non-zero)' % (clusterer.features.shape + (clusterer.features.nnz,)))
+    print('Peak memory: %.1f MB' % peak_memory())
+
+# Vectorize and cluster processed issues chunk by chunk
+def process_stream(mongo):
+    clusterer = DocumentClusterer()
+    clusterer.extract_features_stream(num_features=NUM_FEATURES, stopwords=STOPWORDS, ngram_range=(1,3))
+    
+    # First pass updates IDF and cluster centers, second pass assigns final clusters
+    clusterer.stream_cluster((df['title'] for df in read_chunks(mongo)), num_clusters=NUM_CLUSTERS, 
+                             batch_size=BATCH_SIZE, logging=True)
+    clusterer.save(CLUSTERING_MODEL_FILE)
+    
+    frames, titles = itertools.tee(read_chunks(mongo))
+    assignments = clusterer.stream_predict(df['title'] for df in titles)
+    written = 0
+    
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        f.write('[')
+        
+        for df, (not_null, labels) in zip(frames, assignments):
+            df = df[not_null].filter(items=['id'])
+            
+            if df.empty:
+                continue
+            
+            df.loc[:, 'cluster_index'] = labels.astype('int64')
+            mongo.save('clusters', df, needs_conversion=True)
+            
+            f.write(',' if written > 0 else '')
+            f.write(df.to_json(orient='records')[1:-1])
+            written += len(df)
+        
+        f.write(']')
+    
+    print('Clustered issues: %d' % written)
+    print('Peak memory: %.1f MB' % peak_memory())
+
+# Read processed issues in chunks
+def read_chunks(mongo):
+    cursor = mongo.get_all('processed', {'_id': 0, 'id': 1, 'title': 1}).batch_size(CHUNK_SIZE)
+    
+    return DataCleaner().chunks(cursor, CHUNK_SIZE)
+
+# Get peak resident memory of process in MB
+def peak_memory():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    
 # Run application        
 if __name__ == '__main__':
     process_data()
\ No newline at end of file
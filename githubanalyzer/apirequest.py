@@ -1,13 +1,20 @@
 import time
 import json
-import urllib.request as urlreq
+import urllib.error as urlerror
 import urllib.parse as urlparse
+from githubanalyzer.tokenpool import TokenPool
+from githubanalyzer.connectionpool import ConnectionPool
+from githubanalyzer.responsecache import ResponseCache
 
 class APIRequest:
     
-    def __init__(self, endpoint, headers):
+    def __init__(self, endpoint, headers, pool_size=10, cache_dir=None, pace=True, max_backoff=60, tokens=None):
         self.endpoint = endpoint
         self.headers = headers
+        self.max_backoff = max_backoff
+        self.tokens = TokenPool(tokens if tokens else [None], pace=pace)
+        self.pool = ConnectionPool(max_idle=pool_size)
+        self.cache = ResponseCache(cache_dir) if cache_dir is not None else None
     
     # Build full URL path to API endpoint
     def build(self, path, params=None):
@@ -18,32 +25,127 @@ class APIRequest:
             
         return url
     
-    # Send HTTP request
-    def send(self, url, method='GET', timeout=10):        
-        req = urlreq.Request(url, headers=self.headers, method=method)
+    # Send HTTP request, retrying until a response is received
+    def send(self, url, method='GET', timeout=10, entry=None):
+        resource = self.resource(url)
+        attempt = 0
         
-        try:
-            res = urlreq.urlopen(req, timeout=timeout)
+        while True:
+            try:
+                return self.request(url, method, timeout, entry)
+            except Exception as e:
+                print('URL request error.')
+                print(e.args)
+                
+                if self.tokens.exhausted(resource):
+                    self.wait(resource)
+                else:
+                    self.backoff(attempt)
+                
+                attempt += 1
+    
+    # Send single HTTP request with the token that has most calls left
+    def request(self, url, method='GET', timeout=10, entry=None):        
+        req_headers = dict(self.headers)
+        resource = self.resource(url)
+        
+        if entry is None:
+            entry = self.tokens.select(resource)
+        
+        if entry['token'] is not None:
+            req_headers['Authorization'] = 'token ' + entry['token']
+        
+        limiter = entry['limiter']
+        cached = None
+        
+        if self.cache is not None and method == 'GET':
+            cached = self.cache.get(url)
             
-            headers = res.info()
+            if cached is not None:
+                req_headers.update(self.cache.conditional_headers(cached))
+        
+        # Rate limit status requests and revalidations answered with 304 do not count against the budget,
+        # a conditional request that returns 200 is still accounted for by the response headers
+        conditional = 'If-None-Match' in req_headers or 'If-Modified-Since' in req_headers
         
+        if not urlparse.urlsplit(url).path.endswith('/rate_limit') and not conditional:
+            limiter.acquire(resource)
+        
+        try:
+            status, headers, body = self.pool.request(url, method, req_headers, timeout)
+        except urlerror.HTTPError as e:
+            limiter.update(e.headers, resource)
+            raise
+        
+        limiter.update(headers, resource)
+        
+        if status == 304 and cached is not None:
+            self.cache.hit()
+            link_header = cached['link']
+            data = cached['data']
+        else:
             link_header = headers.__getitem__('Link')
-            data = json.loads(bytes.decode(res.read()))    
-            page = None
-        
-            if link_header is not None:
-                page = self.get_next_page(link_header)
-        
-            return { 
-                'data': data, 
-                'next_page': page,
-                'calls': headers.__getitem__('X-RateLimit-Remaining')
-            }
-        except Exception as e:
-            print('URL request error.')
-            print(e.args)
-            self.wait()
-            self.send(url, method, timeout)
+            data = json.loads(bytes.decode(body))
+            
+            if self.cache is not None and method == 'GET':
+                self.cache.miss()
+                self.cache.set(url, headers, data)
+        
+        page = None
+        next_url = None
+        last_page = None
+        
+        if link_header is not None:
+            page = self.get_next_page(link_header)
+            next_url = self.get_next_url(link_header)
+            last_url = self.get_link_url(link_header, 'last')
+            last_page = self.get_page(last_url) if last_url is not None else None
+        
+        return { 
+            'data': data, 
+            'page': self.get_page(url),
+            'next_page': page,
+            'next_url': next_url,
+            'last_page': last_page,
+            'calls': headers.__getitem__('X-RateLimit-Remaining')
+        }
+    
+    # Determine which rate limit applies to URL
+    def resource(self, url):
+        path = urlparse.urlsplit(url).path
+        
+        return 'search' if path.find('/search/') > -1 else 'core'
+    
+    # Lazily iterate over pages by following Link headers
+    def paginate(self, url, throttle=None, method='GET', timeout=10):
+        while url is not None:
+            if throttle is not None:
+                throttle()
+            
+            res = self.send(url, method, timeout)
+            url = res['next_url']
+            
+            yield res
+    
+    # Parse Link header to get URL of next page
+    def get_next_url(self, link_header):
+        return self.get_link_url(link_header, 'next')
+    
+    # Parse Link header to get URL with given relation
+    def get_link_url(self, link_header, rel):
+        for header in link_header.split(','):
+            parts = header.split(';')
+            
+            if len(parts) > 1 and parts[1].find('"%s"' % rel) > -1:
+                return parts[0].strip()[1:-1]
+        
+        return None
+    
+    # Get page index from URL query string
+    def get_page(self, url):
+        kvp = dict(urlparse.parse_qsl(urlparse.urlsplit(url).query))
+        
+        return int(kvp.get('page', 1))
     
     # Parse Link header to get index of next page
     def get_next_page(self, link_header):
@@ -60,7 +162,39 @@ class APIRequest:
         
         return None
     
-    # Delay script execution
-    def wait(self):
+    # Get response cache hit and miss counters
+    def cache_stats(self):
+        if self.cache is None:
+            return {'hits': 0, 'misses': 0}
+        
+        return self.cache.stats()
+    
+    # Get remaining calls of all tokens, asking the API for unknown budgets
+    def rate_limit(self, resource='core'):
+        for entry in self.tokens.entries:
+            if entry['limiter'].remaining(resource) is None:
+                res = self.send(self.build('rate_limit'), entry=entry)['data']['resources']
+                
+                for name, limits in res.items():
+                    entry['limiter'].set(name, limits['remaining'], limits['reset'])
+        
+        return self.tokens.remaining(resource) or 0
+    
+    # Get time lost to throttling
+    def rate_limit_stats(self):
+        return {'throttled': self.tokens.throttled()}
+    
+    # Get requests sent and calls left per token
+    def token_usage(self, resource='core'):
+        return self.tokens.usage(resource)
+    
+    # Delay script execution until rate limit resets
+    def wait(self, resource='core'):
         print('Waiting...')
-        time.sleep(30)
\ No newline at end of file
+        self.tokens.wait(resource)
+    
+    # Delay retry after a failed request
+    def backoff(self, attempt):
+        delay = min(self.max_backoff, 2 ** attempt)
+        print('Retrying in %d seconds...' % delay)
+        time.sleep(delay)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import asyncio
+import urllib.parse as urlparse
+from concurrent.futures import ThreadPoolExecutor
+from githubanalyzer.collector import GitHubIssueCollector
+
+class AsyncGitHubIssueCollector(GitHubIssueCollector):
+
+    def __init__(self, req, mongo, info=None, max_concurrency=32, calls_per_request=100, **kwargs):
+        super().__init__(req, mongo, info, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.calls_per_request = calls_per_request
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.loop = asyncio.new_event_loop()
+    
+    # Fetch issues from repo keeping several pages in flight
+    def get_issues(self, repo, page=1):
+        self.loop.run_until_complete(self.get_issues_async(repo, page))
+    
+    # Traverse issue pages in windows of concurrent requests
+    async def get_issues_async(self, repo, page=1):
+        next_page = page
+        last_page = None
+        
+        while next_page is not None:
+            remaining = self.rate_limit()
+            
+            if remaining <= 0:
+                await self.loop.run_in_executor(self.executor, self.req.wait)
+                continue
+            
+            limit = self.concurrency_limit(remaining)
+            
+            # Link header of the first response tells where the window has to stop
+            if last_page is None:
+                limit = 1
+            else:
+                limit = max(1, min(limit, last_page - next_page + 1))
+            
+            self.semaphore = asyncio.Semaphore(limit)
+            
+            window = list(range(next_page, next_page + limit))
+            print('Fetching pages %d to %d of issues (%d concurrent requests).' % (window[0], window[-1], limit))
+            
+            responses = await asyncio.gather(*[self.fetch_issues(repo, p) for p in window])
+            next_page = None
+            
+            for p, res in zip(window, responses):
+                if last_page is None and res['last_page'] is not None:
+                    last_page = res['last_page']
+                
+                done = await self.process_page(repo, p, res['data'])
+                
+                if done:
+                    return
+                
+                next_page = res['next_page']
+                
+                if next_page is None:
+                    break
+    
+    # Process a page of issues in order, fetching sampled comments concurrently
+    async def process_page(self, repo, page, data):
+        self.info['issues_page'] = page
+        print('Traversing page %d of issues.' % page)
+        print('Collected issues from %s: %d' % (repo, self.info['collected_items']))
+        self.print_usage()
+        
+        entries = self.sample_page(data)
+        pending = [(index, issue) for index, issue, sampled, issue_comments in entries if issue_comments is not None]
+        comments = await asyncio.gather(*[self.fetch_comments(issue) for index, issue in pending])
+        fetched = dict((index, issue_comments) for (index, issue), issue_comments in zip(pending, comments))
+        
+        # Progress only moves past issues once they are handed to the buffer
+        self.store_issues([(index, issue, sampled, fetched.get(index, issue_comments)) 
+                           for index, issue, sampled, issue_comments in entries])
+        
+        return self.sample_complete()
+    
+    # Comments of sampled issues are gathered concurrently in process_page
+    def start_comments(self, issue, index):
+        return list()
+    
+    # Fetch a single page of issues
+    async def fetch_issues(self, repo, page):
+        return await self.fetch(self.issues_url(repo, page))
+    
+    # Fetch all comments of an issue
+    async def fetch_comments(self, issue):
+        issue_comments = list()
+        page = 1
+        
+        if issue['comments'] == 0 or self.bulk_comments:
+            return issue_comments
+        
+        print('Fetching comments for issue %d' % issue['number'])
+        
+        while page is not None:
+            params = {
+                'per_page': 100,
+                'page': page
+            }
+            
+            res = await self.fetch(issue['comments_url'] + '?' + urlparse.urlencode(params))
+            issue_comments.extend(res['data'])
+            page = res['next_page']
+        
+        return issue_comments
+    
+    # Send request in worker thread once a concurrency slot is free
+    async def fetch(self, url):
+        async with self.semaphore:
+            return await self.loop.run_in_executor(self.executor, self.req.send, url)
+    
+    # Derive number of concurrent requests from remaining API calls
+    def concurrency_limit(self, remaining):
+        return max(1, min(self.max_concurrency, remaining // self.calls_per_request))
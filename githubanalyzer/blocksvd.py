@@ -0,0 +1,98 @@
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.utils import check_random_state
+
+class BlockRandomizedSVD:
+
+    def __init__(self, n_components=100, oversamples=10, n_iter=4, block_size=10000, random_state=None):
+        self.n_components = n_components
+        self.oversamples = oversamples
+        self.n_iter = n_iter
+        self.block_size = block_size
+        self.random_state = random_state
+    
+    # Iterate over row blocks of matrix
+    def blocks(self, features):
+        for start in range(0, features.shape[0], self.block_size):
+            yield start, features[start:start + self.block_size]
+    
+    # Build starting subspace, reusing previous components when their shape matches
+    def start_basis(self, num_features, init=None):
+        rand = check_random_state(self.random_state)
+        size = min(self.n_components + self.oversamples, num_features)
+        basis = rand.normal(size=(num_features, size))
+        
+        if init is not None and init.shape[1] == num_features:
+            num_init = min(init.shape[0], size)
+            basis[:, :num_init] = init[:num_init].T
+        
+        return basis
+    
+    # Multiply Gram matrix of features with basis one row block at a time
+    def gram_product(self, features, basis):
+        product = np.zeros_like(basis)
+        
+        for start, block in self.blocks(features):
+            product += block.T.dot(block.dot(basis))
+        
+        return product
+    
+    # Find top right singular vectors by subspace iteration over row blocks
+    def fit(self, features, init=None):
+        basis = self.start_basis(features.shape[1], init)
+        basis, r = np.linalg.qr(basis)
+        
+        for i in range(self.n_iter):
+            basis, r = np.linalg.qr(self.gram_product(features, basis))
+        
+        # Project onto subspace and solve the small eigenproblem of its Gram matrix
+        gram = np.zeros((basis.shape[1], basis.shape[1]))
+        
+        for start, block in self.blocks(features):
+            projected = np.asarray(block.dot(basis))
+            gram += projected.T.dot(projected)
+        
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        order = np.argsort(eigenvalues)[::-1][:self.n_components]
+        
+        self.components_ = basis.dot(eigenvectors[:, order]).T
+        self.singular_values_ = np.sqrt(np.maximum(eigenvalues[order], 0))
+        
+        # Fix signs so that the largest loading of each component is positive
+        signs = np.sign(self.components_[range(len(order)), np.argmax(np.abs(self.components_), axis=1)])
+        self.components_ *= signs[:, np.newaxis]
+        
+        return self
+    
+    # Project features block by block into output array, tracking explained variance
+    def transform(self, features, out=None):
+        num_rows = features.shape[0]
+        out = out if out is not None else np.zeros((num_rows, self.components_.shape[0]))
+        col_sum = np.zeros(features.shape[1])
+        col_sq_sum = np.zeros(features.shape[1])
+        
+        for start, block in self.blocks(features):
+            out[start:start + block.shape[0]] = block.dot(self.components_.T)
+            col_sum += np.asarray(block.sum(axis=0)).ravel()
+            col_sq_sum += np.asarray(block.multiply(block).sum(axis=0)).ravel()
+        
+        total_var = (col_sq_sum / num_rows - (col_sum / num_rows) ** 2).sum()
+        self.explained_variance_ = np.var(out, axis=0)
+        self.explained_variance_ratio_ = self.explained_variance_ / total_var
+        
+        return out
+    
+    # Fit components and project features
+    def fit_transform(self, features, init=None, out=None):
+        return self.fit(features, init).transform(features, out)
+    
+    # Copy fitted components into TruncatedSVD so it can be used in a pipeline
+    def to_truncated_svd(self):
+        svd = TruncatedSVD(n_components=self.n_components, random_state=self.random_state)
+        svd.components_ = self.components_
+        svd.singular_values_ = self.singular_values_
+        svd.explained_variance_ = self.explained_variance_
+        svd.explained_variance_ratio_ = self.explained_variance_ratio_
+        svd.n_features_in_ = self.components_.shape[1]
+        
+        return svd
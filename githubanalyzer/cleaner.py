@@ -1,4 +1,10 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool
 from nltk.corpus import stopwords
+from githubanalyzer.minhash import MinHasher
+
+ENGLISH_WORDS = None
 
 class DataCleaner:
     
@@ -31,32 +37,86 @@ class DataCleaner:
         
         return data
     
-    # Remove non English entries
-    def filter_english(self, data, fields):
-        english = set(stopwords.words('english'))
-        is_english = dict()
-        column_names = list()
+    # Remove rows whose values were already seen in earlier chunks
+    def remove_seen(self, data, fields, seen, duplicate_each=False):
+        if duplicate_each:
+            keys = zip(*[[(field, key) for key in pd.util.hash_pandas_object(data[field], index=False)] 
+                         for field in fields])
+        else:
+            keys = ([key] for key in pd.util.hash_pandas_object(data[fields], index=False))
         
-        for field in fields:
-            is_english[field] = list()
-            entries = data[field].str.split(' ')
+        keep = list()
+        
+        # Like drop_duplicates field by field, a row only registers values up to its first repeated one
+        for row_keys in keys:
+            new = True
             
-            for text in entries:
-                word_count = 0
+            for key in row_keys:
+                if key in seen:
+                    new = False
+                    break
                 
-                for word in text:
-                    if word.lower() in english: word_count += 1
+                seen.add(key)
             
-                is_english[field].append(word_count > 0)
-                          
-            column_name = field + '_is_english'
-            column_names.append(column_name)
-            data.loc[:, column_name] = is_english[field]
+            keep.append(new)
         
-        filtered = data.filter(items=column_names)
-        has_english = filtered.isin([True]).sum(axis=1) > 0
+        return data[pd.Series(keep, index=data.index, dtype=bool)]
+    
+    # Remove rows similar to earlier rows or to rows indexed in earlier chunks
+    def remove_near_duplicates(self, data, fields, index, hasher=None):
+        if data.empty:
+            return data
+        
+        hasher = hasher if hasher is not None else MinHasher(index.num_perm)
+        texts = data[fields].fillna('').astype(str).agg(' '.join, axis=1)
+        keep = [index.add(hasher.signature(text)) for text in texts]
+        
+        return data[np.array(keep, dtype=bool)]
+    
+    # Read cursor into dataframes of fixed size
+    def chunks(self, cursor, chunk_size=10000):
+        chunk = list()
         
-        data = data[has_english]
-        data = data.drop(column_names, axis=1)
+        for item in cursor:
+            chunk.append(item)
+            
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk)
+                chunk = list()
         
-        return data
\ No newline at end of file
+        if chunk:
+            yield pd.DataFrame(chunk)
+    
+    # Remove non English entries
+    def filter_english(self, data, fields, processes=1, chunk_size=100000):
+        if processes > 1 and len(data) > chunk_size:
+            chunks = [data[fields].iloc[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+            
+            with Pool(processes) as pool:
+                masks = pool.starmap(english_mask, [(chunk, fields) for chunk in chunks])
+            
+            has_english = np.concatenate(masks)
+        else:
+            has_english = english_mask(data, fields)
+        
+        return data[has_english]
+
+# Get English stopwords, loading them once per process
+def english_words():
+    global ENGLISH_WORDS
+    
+    if ENGLISH_WORDS is None:
+        ENGLISH_WORDS = frozenset(stopwords.words('english'))
+    
+    return ENGLISH_WORDS
+
+# Mark rows containing at least one English stopword in any field
+def english_mask(data, fields):
+    english = english_words()
+    has_english = np.zeros(len(data), dtype=bool)
+    
+    for field in fields:
+        words = data[field].str.lower().str.split(' ')
+        has_english |= ~words.map(english.isdisjoint).values.astype(bool)
+    
+    return has_english
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 import random
+import time
+import hashlib
 import matplotlib.pyplot as plt
 from collections import Counter
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -14,6 +16,8 @@ from sklearn.feature_selection import mutual_info_classif
 from sklearn.externals import joblib
 from scipy import sparse
 from scipy.spatial.distance import cdist, pdist
+from githubanalyzer.streamingvectorizer import StreamingTfidfVectorizer
+from githubanalyzer.blocksvd import BlockRandomizedSVD
 
 class DocumentClusterer:
     
@@ -33,15 +37,87 @@ class DocumentClusterer:
                                  sublinear_tf=True)
         self.features = self.vectorizer.fit_transform(item for item in data)
   
+    # Create hashing vectorizer whose IDF is updated chunk by chunk
+    def extract_features_stream(self, num_features=2 ** 20, stopwords=True, ngram_range=(1,3)):
+        if isinstance(stopwords, list):
+            stop = stopwords
+        elif stopwords is True:
+            stop = 'english'
+        else:
+            stop = None
+        
+        self.vectorizer = StreamingTfidfVectorizer(num_features=num_features, stop_words=stop, 
+                                                   ngram_range=ngram_range)
+    
+    # Get hash of vocabulary terms in column order, identifying the feature space
+    def vocabulary_hash(self):
+        vocabulary = self.vectorizer.vocabulary_
+        terms = sorted(vocabulary, key=vocabulary.get)
+        
+        return hashlib.sha1('\n'.join(terms).encode('utf-8')).hexdigest()
+    
     # Transform document to vector (using existing vocabulary)
     def vectorize(self, data):
         return self.vectorizer.transform(item for item in data)
         
     # Cluster documents
-    def cluster(self, features, num_clusters=2, max_iterations=300, logging=False):
-        self.model = KMeans(num_clusters, max_iter=max_iterations, verbose=logging)
-        self.model.fit(features)
+    def cluster(self, features, num_clusters=2, max_iterations=300, logging=False, init=None, 
+                n_jobs=None, algorithm='auto'):
+        self.fit_stats = list()
+        self.model = self.kmeans(num_clusters, features.shape[1], init, max_iterations, logging, n_jobs, algorithm)
+        self.fit_timed(self.model, features, level=1)
         self.clusters = self.model.labels_
+        
+        if logging:
+            stats = self.fit_stats[-1]
+            print('KMeans converged in %d iterations (%.2f s)' % (stats['iterations'], stats['time']))
+    
+    # Create KMeans model, starting from previous centers when their shape matches
+    def kmeans(self, num_clusters, num_features, init=None, max_iterations=300, logging=False, 
+               n_jobs=None, algorithm='auto'):
+        if init is not None and init.shape == (num_clusters, num_features):
+            return KMeans(num_clusters, init=init, n_init=1, max_iter=max_iterations, verbose=logging, 
+                          n_jobs=n_jobs, algorithm=algorithm)
+        
+        return KMeans(num_clusters, max_iter=max_iterations, verbose=logging, n_jobs=n_jobs, algorithm=algorithm)
+    
+    # Fit model, recording time to convergence and number of iterations
+    def fit_timed(self, model, features, level):
+        start = time.time()
+        model.fit(features)
+        
+        self.fit_stats.append({
+            'level': level,
+            'time': time.time() - start,
+            'iterations': model.n_iter_,
+            'warm_start': not isinstance(model.init, str)
+        })
+    
+    # Sum fit time and iterations per hierarchy level
+    def fit_summary(self):
+        summary = dict()
+        
+        for stats in self.fit_stats:
+            level = summary.setdefault(stats['level'], {'models': 0, 'warm_start': 0, 'time': 0.0, 'iterations': 0})
+            level['models'] += 1
+            level['warm_start'] += int(stats['warm_start'])
+            level['time'] += stats['time']
+            level['iterations'] += stats['iterations']
+        
+        return summary
+    
+    # Get centers of hierarchy models keyed by their cluster path
+    def hierarchy_centers(self):
+        centers = dict()
+        
+        for cluster, node in self.hierarchy.items():
+            centers[(cluster,)] = node['model'].cluster_centers_
+            
+            for subcluster in node:
+                if subcluster not in ('model', 'features'):
+                    centers[(cluster, subcluster)] = node[subcluster]['model'].cluster_centers_
+        
+        return centers
     
     # Cluster documents using batches
     def batch_cluster(self, features, num_clusters=2, batch_size=500, max_iterations=300, logging=False):
@@ -50,6 +126,45 @@ class DocumentClusterer:
         self.model.fit(features)
         self.clusters = self.model.labels_
         
+    # Cluster chunks of documents without holding the whole corpus in memory
+    def stream_cluster(self, chunks, num_clusters=2, batch_size=500, logging=False):
+        self.model = MiniBatchKMeans(num_clusters, batch_size=batch_size, verbose=logging)
+        pending = None
+        
+        for chunk in chunks:
+            features = self.remove_nulls(self.vectorizer.partial_fit_transform(chunk))
+            
+            # First update needs at least one sample per cluster
+            pending = features if pending is None else sparse.vstack([pending, features], format='csr')
+            
+            if pending.shape[0] < num_clusters:
+                continue
+            
+            self.model.partial_fit(pending)
+            pending = None
+            
+            if logging:
+                print('Clustered %d documents.' % self.vectorizer.num_docs)
+        
+        if pending is not None and pending.shape[0] >= num_clusters:
+            self.model.partial_fit(pending)
+    
+    # Assign chunks of documents to clusters, yielding non-null row mask and labels
+    def stream_predict(self, chunks):
+        for chunk in chunks:
+            features = self.vectorizer.transform(chunk)
+            not_null = self.not_null(features)
+            
+            if not not_null.any():
+                yield not_null, np.zeros(0, dtype=np.int32)
+                continue
+            
+            yield not_null, self.model.predict(features[not_null])
+    
+    # Check whether model was fitted chunk by chunk, without features, scaling or hierarchy
+    def is_streaming(self):
+        return isinstance(self.vectorizer, StreamingTfidfVectorizer)
+    
     # Predict cluster assignment
     def predict(self, features, level=1, scale=False):
         if scale is True:
@@ -78,13 +193,100 @@ class DocumentClusterer:
         
         return self.model.predict(features)
     
+    # Assign new documents through every hierarchy level and append them to the model
+    def add_documents(self, features):
+        scaled = self.scale_func.transform(features)
+        assignment = self.predict(scaled, level=3)
+        start = self.scaled_features.shape[0]
+        nodes = dict()
+        
+        for offset, path in enumerate(assignment):
+            item = (start + offset, scaled[offset])
+            self.append_to_node(nodes, (path[0],), self.hierarchy[path[0]], item, path[1])
+            
+            if len(path) > 2:
+                self.append_to_node(nodes, (path[0], path[1]), self.hierarchy[path[0]][path[1]], item, path[2])
+        
+        # Labels are extended once per node so they stay aligned with node features
+        for node, labels in nodes.values():
+            node['model'].labels_ = np.append(node['model'].labels_, labels)
+        
+        top_level = np.array([path[0] for path in assignment], dtype=self.clusters.dtype)
+        
+        self.update_drift(scaled, top_level)
+        self.scaled_features = np.vstack([self.scaled_features, scaled])
+        self.features = sparse.vstack([self.features, features], format='csr')
+        self.clusters = np.append(self.clusters, top_level)
+        self.model.labels_ = self.clusters
+        
+        return assignment
+    
+    # Add document to node features, collecting its label for the node model
+    def append_to_node(self, nodes, key, node, item, label):
+        node['features'].append(item)
+        nodes.setdefault(key, (node, list()))[1].append(label)
+    
+    # Track how far new documents are from the clusters they were assigned to
+    def update_drift(self, scaled, labels):
+        self.init_drift()
+        distances = self.model.transform(scaled)[np.arange(len(labels)), labels] ** 2
+        self.drift['added'] += len(labels)
+        self.drift['distance_sum'] += float(distances.sum())
+    
+    # Record new documents that had no known terms and could not be assigned
+    def add_nulls(self, ids):
+        self.init_drift()
+        self.drift['null'].update(ids)
+    
+    # Start drift counters from the state of the fitted model
+    def init_drift(self):
+        if hasattr(self, 'drift'):
+            return
+        
+        self.drift = {
+            'fitted': len(self.clusters),
+            'added': 0,
+            'baseline_distance': self.model.inertia_ / len(self.clusters),
+            'distance_sum': 0.0,
+            'null': set(),
+            'excluded': set(getattr(self, 'excluded', ()))
+        }
+    
+    # Get drift of added documents relative to the fitted model
+    def drift_metrics(self):
+        self.init_drift()
+        drift = self.drift
+        added = drift['added']
+        nulls = len(drift['null'])
+        
+        return {
+            'added': added,
+            'added_ratio': added / drift['fitted'],
+            'distance_ratio': (drift['distance_sum'] / added) / drift['baseline_distance'] if added else 1.0,
+            'null_ratio': nulls / (added + nulls) if added + nulls else 0.0
+        }
+    
+    # Check whether drift metrics call for refitting the whole pipeline
+    def needs_refit(self, max_added=0.2, max_distance=1.5, max_null=0.1):
+        metrics = self.drift_metrics()
+        
+        return (metrics['added_ratio'] > max_added or metrics['distance_ratio'] > max_distance 
+                or metrics['null_ratio'] > max_null)
+    
     # Build hierarchical cluster tree
-    def build_hierarchy(self, features, cluster_indices, num_clusters=5, max_cluster_size=100):
+    def build_hierarchy(self, features, cluster_indices, num_clusters=5, max_cluster_size=100, 
+                        previous=None, n_jobs=None, algorithm='auto'):
         options = {
             'max_level':3,
-            'max_cluster_size': max_cluster_size
+            'max_cluster_size': max_cluster_size,
+            'previous': previous or dict(),
+            'n_jobs': n_jobs,
+            'algorithm': algorithm
         }
         
+        if not hasattr(self, 'fit_stats'):
+            self.fit_stats = list()
+        
         self.hierarchy = dict()
         clusters = dict()
         
@@ -107,9 +309,16 @@ class DocumentClusterer:
         options['level'] += 1
         subcluster_indices = list()
         
-        model = KMeans(num_clusters)
         f = [item[1] for item in features]
-        model.fit(f)
+        
+        if 'subcluster_index' in options:
+            path = (options['cluster_index'], options['subcluster_index'])
+        else:
+            path = (options['cluster_index'],)
+        
+        model = self.kmeans(num_clusters, len(f[0]), options['previous'].get(path), 
+                            n_jobs=options['n_jobs'], algorithm=options['algorithm'])
+        self.fit_timed(model, f, options['level'])
         
         if 'subcluster_index' in options:
             self.hierarchy[options['cluster_index']][options['subcluster_index']]['model'] = model
@@ -138,16 +347,43 @@ class DocumentClusterer:
             options['level'] -= 1
             
     # Reduce data dimensionality
-    def scale_data(self, features, num_dimensions=2, save_features=False, algorithm='arpack', random_seed=None):
-        svd = TruncatedSVD(n_components=num_dimensions, algorithm=algorithm, random_state=random_seed)
-        self.scale_func = make_pipeline(svd, Normalizer(copy=False))
-        scaled = self.scale_func.fit_transform(features)
+    def scale_data(self, features, num_dimensions=2, save_features=False, algorithm='arpack', random_seed=None, 
+                   init=None, block_size=10000, output_file=None):
+        if algorithm == 'block':
+            scaled = self.block_scale(features, num_dimensions, random_seed, init, block_size, output_file)
+        else:
+            svd = TruncatedSVD(n_components=num_dimensions, algorithm=algorithm, random_state=random_seed)
+            self.scale_func = make_pipeline(svd, Normalizer(copy=False))
+            scaled = self.scale_func.fit_transform(features)
         
         if save_features is True:
             self.scaled_features = scaled
             
         return scaled
     
+    # Reduce dimensionality by randomized subspace iteration over row blocks
+    def block_scale(self, features, num_dimensions=2, random_seed=None, init=None, block_size=10000, output_file=None):
+        reducer = BlockRandomizedSVD(num_dimensions, block_size=block_size, random_state=random_seed)
+        out = None
+        
+        # Reduced features are written to a .npy file that can be memory mapped
+        if output_file is not None:
+            out = np.lib.format.open_memmap(output_file, mode='w+', dtype=np.float64, 
+                                            shape=(features.shape[0], num_dimensions))
+        
+        scaled = reducer.fit_transform(features, init, out)
+        normalizer = Normalizer(copy=False).fit(scaled[:1])
+        
+        for start in range(0, scaled.shape[0], block_size):
+            scaled[start:start + block_size] = normalizer.transform(scaled[start:start + block_size])
+        
+        if output_file is not None:
+            scaled.flush()
+        
+        self.scale_func = make_pipeline(reducer.to_truncated_svd(), normalizer)
+        
+        return scaled
+    
     # Evaluate clustering accuracy
     def score_clustering(self, features, sample_size=None):
         sil_score = silhouette_score(features, self.clusters, sample_size=sample_size)
@@ -215,10 +451,14 @@ class DocumentClusterer:
         
     # Remove null vectors
     def remove_nulls(self, features):
-        features = features.toarray()
-        features = features[~np.all(features == 0, axis=1)]
+        return sparse.csr_matrix(features)[self.not_null(features)]
+    
+    # Mark rows with at least one non-zero value
+    def not_null(self, features):
+        features = sparse.csr_matrix(features, copy=True)
+        features.eliminate_zeros()
         
-        return sparse.csr_matrix(features)
+        return features.getnnz(axis=1) > 0
     
     # Determine number of clusters using the Elbow method
     def elbow(self, features, k_range=(2, 20), sample_size=None, batch=False, batch_size=500):
@@ -1,14 +1,30 @@
+import sys
 import random
+import hashlib
 import itertools
 import urllib.parse as urlparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from pymongo import UpdateOne
+from githubanalyzer.writebuffer import WriteBuffer
+from githubanalyzer.seenindex import SeenIndex
 
 class GitHubIssueCollector:
     
-    def __init__(self, req, mongo, info=None):
+    def __init__(self, req, mongo, info=None, checkpoint=None, buffer_size=500, flush_interval=30, 
+                 bulk_comments=False, sampling='index', seed=None, comment_workers=0, schema=None, 
+                 skip_seen=True):
         self.req = req
         self.mongo = mongo
         self.issues = self.mongo.db.collected
-        self.calls_left = dict()
+        self.checkpoint = checkpoint
+        self.bulk_comments = bulk_comments
+        self.sampling = sampling
+        self.schema = schema
+        self.seen = SeenIndex(self.issues) if skip_seen else None
+        self.buffer = WriteBuffer(self.issues, self.save_info, max_size=buffer_size, max_wait=flush_interval, 
+                                  schema=schema)
+        self.comment_pool = ThreadPoolExecutor(max_workers=comment_workers) if comment_workers > 0 else None
+        self.page_pool = ThreadPoolExecutor(max_workers=1) if comment_workers > 0 else None
         
         if info is None:
             self.info = {
@@ -22,22 +38,22 @@ class GitHubIssueCollector:
                 'total_issues': 0,
                 'collect_total': 0,
                 'collected_items': 0,
-                'interrupted': False
+                'interrupted': False,
+                'sample_seed': seed if seed is not None else random.getrandbits(32),
+                'sample_rate': 0
             }
         else:
             self.info = info
     
     # Collect issues from repos
     def collect(self, page=1, sample_percent=25):
-        if self.rate_limit('search') > 0:
-            self.info['repos_page'] = page
-            print('Fetching repos...')
-            print('Traversing page %d of repos.' % page)
+        print('Fetching repos...')
+        
+        for res in self.req.paginate(self.repos_url(page), self.throttle('search')):
+            self.info['repos_page'] = res['page']
+            print('Traversing page %d of repos.' % res['page'])
             
-            res = self.get_repos(page)
-            next_page = res['next_page']
             repos = res['data']['items']
-            self.set_rate_limit(res['calls'], 'search')
             
             for repo in repos:
                 repo_name = repo['full_name']
@@ -49,13 +65,19 @@ class GitHubIssueCollector:
                         self.info['interrupted'] = False
                         self.info['repo_sample'] = set(self.info['repo_sample'])
                         self.get_issues(repo_name, self.info['issues_page'])
+                elif self.sampling == 'bernoulli':
+                    self.info['repo_name'] = repo_name
+                    print('Fetching issues from %s' % repo_name)
+                    
+                    self.start_bernoulli_sample(sample_percent)
+                    self.get_issues(repo_name)
                 else: 
                     self.info['repo_name'] = repo_name
                     print('Fetching issues from %s' % repo_name)
                     
                     num_results = self.result_count(repo_name)
                     
-                    if num_results is 0:
+                    if num_results == 0:
                         continue
                     else:
                         self.info['total_issues'] = num_results
@@ -65,109 +87,150 @@ class GitHubIssueCollector:
                         self.info['collected_items'] = 0
                              
                         self.get_issues(repo_name)
+                
+                if self.bulk_comments:
+                    self.harvest_comments(repo_name)
+                
+                self.flush()
+    
+    # Re-crawl repos fetching only issues updated since their high-water mark
+    def collect_incremental(self, repos=None, sample_percent=25):
+        if repos is None:
+            repos = self.mongo.collected_repos()
+        
+        for repo in repos:
+            self.update_issues(repo, sample_percent)
+    
+    # Collect new and changed issues from repo
+    def update_issues(self, repo, sample_percent=25):
+        since = self.mongo.get_watermark(repo)
+        
+        if since is None:
+            since = self.mongo.latest_update(self.req.build('repos/' + repo)) or '2015-01-01T00:00:00Z'
+        
+        print('Updating issues from %s since %s' % (repo, since))
+        
+        params = {
+            'state': 'closed',
+            'sort': 'updated',
+            'direction': 'asc',
+            'since': since,
+            'per_page': 100
+        }
+        
+        url = self.req.build('repos/' + repo + '/issues', params)
+        updated = 0
+        
+        for res in self.req.paginate(url, self.throttle()):
+            print('Traversing page %d of updated issues.' % res['page'])
+            latest = since
             
-            if next_page is not None:
-                self.collect(next_page, sample_percent)
-        else:
-            self.req.wait()
-            self.collect(page, sample_percent)
+            for issue in res['data']:
+                if 'pull_request' in issue:
+                    continue
+                
+                latest = max(latest, issue['updated_at'])
+                stored = self.issues.find_one({'id': issue['id']}, {'_id':0, 'issue_comments':1})
+                
+                # Sample issues created since the last crawl, skip old unsampled ones
+                if stored is None:
+                    if issue['created_at'] <= since or random.random() >= sample_percent / 100:
+                        continue
+                    
+                    stored = {'issue_comments': list()}
+                
+                issue['issue_comments'] = stored['issue_comments']
+                
+                if issue['comments'] > 0:
+                    issue['issue_comments'] = self.update_comments(issue['comments_url'], since, issue['issue_comments'])
+                
+                self.buffer.add(issue)
+                updated += 1
+            
+            self.flush()
+            self.mongo.set_watermark(repo, latest)
+        
+        print('Updated issues from %s: %d' % (repo, updated))
+    
+    # Merge comments changed since date into stored comments
+    def update_comments(self, comments_url, since, issue_comments):
+        changed = list()
+        self.get_comments(comments_url + '?' + urlparse.urlencode({'since': since}), changed)
+        
+        changed_ids = set(comment['id'] for comment in changed)
+        merged = [comment for comment in issue_comments if comment['id'] not in changed_ids]
+        merged.extend(changed)
+        merged.sort(key=lambda comment: comment['created_at'])
+        
+        return merged
+    
+    # Write buffered issues and save progress
+    def flush(self):
+        self.buffer.flush()
+    
+    # Save progress through checkpoint callback
+    def save_info(self):
+        if self.checkpoint is not None:
+            self.checkpoint(self.info)
     
     # Collect a random sample of issues from random repos
     def collect_random(self, num_repos=30, num_issues=1, stars='5000..10000'):
-         if self.rate_limit('search') > 0:
-            print('Fetching repos...')
-            res = self.get_repos(1, stars)
-            num_results = int(res['data']['total_count'])
-            next_page = res['next_page']
+        print('Fetching repos...')
+        self.throttle('search')()
+        
+        res = self.get_repos(1, stars)
+        num_results = int(res['data']['total_count'])
+        
+        sample = set(random.sample(range(num_results), num_repos))
+        
+        repos = self.get_random_repos(sample, res)
+        issues = list()
+        
+        for repo in repos:
+            print('Getting issues from %s' % repo)
+            count = self.result_count(repo)
             
-            sample = set(random.sample(range(num_results), num_repos))
+            if count == 0:
+                continue
             
-            options = {
-                'current_index': 0,
-                'page': 1,
-                'next_page': next_page, 
-                'stars': stars,
-                'items': res['data']['items']
-            }
+            sample_size = num_issues if num_issues < count else count
+            sample = set(random.sample(range(count), sample_size))
             
-            repos = self.get_random_repos(sample, options)
-            issues = list()
+            issues.append(self.get_random_issues(repo, sample))
             
-            for repo in repos:
-                print('Getting issues from %s' % repo)
-                count = self.result_count(repo)
-                
-                if count == 0:
-                    continue
-                
-                sample_size = num_issues if num_issues < count else count
-                sample = set(random.sample(range(count), sample_size))
-
-                options = {
-                    'current_index':0,
-                    'page':1
-                }
-                
-                issues.append(self.get_random_issues(repo, sample, options, issues=list()))
-                
-            return list(itertools.chain.from_iterable(issues))
-         else:
-            self.req.wait()
-            self.collect_random(num_repos, num_issues, stars)
+        return list(itertools.chain.from_iterable(issues))
         
     # Get random repos
-    def get_random_repos(self, sample, options, repos=list()):
-        if options['items'] is not None:
-            print('Traversing page %d of repos.' % (options['page']))
+    def get_random_repos(self, sample, first_page):
+        repos = list()
+        current_index = 0
+        pages = itertools.chain([first_page], self.req.paginate(first_page['next_url'], self.throttle('search')))
+        
+        for res in pages:
+            print('Traversing page %d of repos.' % res['page'])
             
-            for repo in options['items']:
-                if options['current_index'] in sample:
+            for repo in res['data']['items']:
+                if current_index in sample:
                     repos.append(repo['full_name'])
                 
-                options['current_index'] += 1
-                
-            options['items'] = None
-        else:
-            if self.rate_limit('search') > 0:
-                res = self.get_repos(options['next_page'], options['stars'])
-                options['next_page'] = res['next_page']
-                options['items'] = res['data']['items']
-                
-                self.get_random_repos(sample, options, repos)
-            else:
-                self.req.wait()
-                self.get_random_repos(sample, options, repos)
-        
-        if len(repos) == len(sample):
-            return repos
+                current_index += 1
             
-        if options['next_page'] is not None:
-            options['page'] += 1
-            return self.get_random_repos(sample, options, repos)
+            if len(repos) == len(sample):
+                break
+        
+        return repos
     
     # Get random issues
-    def get_random_issues(self, repo, sample, options, issues): 
-        print('Traversing page %d of issues.' % options['page'])
-        
-        params = {
-            'state': 'closed',
-            'sort': 'created',
-            'direction': 'desc',
-            'since': '2015-01-01T00:00:00Z',
-            'per_page': 100,
-            'page': options['page']
-        }
+    def get_random_issues(self, repo, sample): 
+        issues = list()
+        current_index = 0
         
-        if self.rate_limit() > 0:
-            url = self.req.build('repos/' + repo + '/issues', params)
-            res = self.req.send(url)
-            options['page'] = res['next_page']
-            data = res['data']
-            self.set_rate_limit(res['calls'])
+        for res in self.req.paginate(self.issues_url(repo), self.throttle()):
+            print('Traversing page %d of issues.' % res['page'])
             
-            for issue in data:
+            for issue in res['data']:
                 if 'pull_request' not in issue:
-                    if options['current_index'] in sample:
+                    if current_index in sample:
                         issues.append(issue)
                         print('Issue collected.')
                         
@@ -175,16 +238,16 @@ class GitHubIssueCollector:
                             print('Exiting...')
                             return issues            
                     
-                    options['current_index'] += 1
+                    current_index += 1
         
-            if options['page'] is not None:
-                return self.get_random_issues(repo, sample, options, issues)
-        else:
-            self.req.wait()
-            self.get_random_issues(repo, sample, options, issues)
+        return issues
         
     # Fetch repositories
     def get_repos(self, page, stars='>=10000'):
+        return self.req.send(self.repos_url(page, stars))
+    
+    # Build URL of repository search page
+    def repos_url(self, page=1, stars='>=10000'):
         params = {
             'q': 'language:javascript stars:%s' % stars,
             'sort': 'stars',
@@ -193,111 +256,241 @@ class GitHubIssueCollector:
             'page': page
         }
         
-        url = self.req.build('search/repositories', params)
+        return self.req.build('search/repositories', params)
+    
+    # Build URL of repo issues page
+    def issues_url(self, repo, page=1):
+        params = {
+            'state': 'closed',
+            'sort': 'created',
+            'direction': 'desc',
+            'since': '2015-01-01T00:00:00Z',
+            'per_page': 100,
+            'page': page
+        }
         
-        return self.req.send(url)
+        return self.req.build('repos/' + repo + '/issues', params)
     
     # Fetch issues from repo
     def get_issues(self, repo, page=1):
-        if self.rate_limit() > 0:
-            self.info['issues_page'] = page
-            print('Traversing page %d of issues.' % page)
+        pages = self.req.paginate(self.issues_url(repo, page), self.throttle())
+        res = next(pages, None)
+        
+        while res is not None:
+            self.info['issues_page'] = res['page']
+            print('Traversing page %d of issues.' % res['page'])
             print('Collected issues from %s: %d' % (repo, self.info['collected_items']))
+            self.print_usage()
             
-            params = {
-                'state': 'closed',
-                'sort': 'created',
-                'direction': 'desc',
-                'since': '2015-01-01T00:00:00Z',
-                'per_page': 100,
-                'page': page
-            }
+            entries = self.sample_page(res['data'])
+            pending = sum(1 for index, issue, sampled, issue_comments in entries if sampled)
+            upcoming = None
             
-            url = self.req.build('repos/' + repo + '/issues', params)
-            res = self.req.send(url)
-            next_page = res['next_page']
-            data = res['data']
-            self.set_rate_limit(res['calls'])
+            # Next page is fetched in the background unless this page ends the repo or the sample
+            if self.page_pool is not None and res['next_url'] is not None and not self.sample_complete(pending):
+                upcoming = self.page_pool.submit(next, pages, None)
             
-            for issue in data:
-                if 'pull_request' not in issue:
-                    num = issue['number']
-                    
-                    if num > self.info['issue_number']:
-                        continue
-                    
-                    self.info['issue_number'] = num
-                    
-                    if self.info['current_index'] in self.info['repo_sample']:
-                        issue_comments = list()
-                             
-                        if issue['comments'] > 0:
-                            print('Fetching comments for issue %d (%d)' % (self.info['current_index'], num))
-                            self.get_comments(issue['comments_url'], issue_comments)
-                        
-                        issue['issue_comments'] = issue_comments
-                        self.issues.insert_one(issue)
-                        print('Issue %d collected.' % self.info['current_index'])
-                        self.info['collected_items'] += 1
-                               
-                    self.info['current_index'] += 1
-                    
-                    # Exit method after gathering the specified total
-                    if self.info['collected_items'] >= self.info['collect_total']: 
-                        return
+            self.store_issues(entries)
             
-            if next_page is not None:
-                self.get_issues(repo, next_page)
-        else:
-            self.req.wait()
-            self.get_issues(repo, page)
+            if self.sample_complete():
+                return
+            
+            res = upcoming.result() if upcoming is not None else next(pages, None)
     
-    # Fetch issue comments
-    def get_comments(self, comments_url, issue_comments, page=1):
-        if self.rate_limit() > 0:
-            self.info['comments_page'] = page
-            print('Retrieving comments...')
-            print('Traversing page %d of comments.' % page)
+    # Select issues of page to sample, starting their comment fetches without advancing progress
+    def sample_page(self, data):
+        entries = list()
+        number = self.info['issue_number']
+        index = self.info['current_index']
+        pending = 0
+        
+        for issue in data:
+            if 'pull_request' in issue or issue['number'] > number:
+                continue
             
-            params = {
-                'per_page': 100,
-                'page': page
-            }
+            number = issue['number']
+            sampled = self.in_sample(issue, index)
+            issue_comments = None
+            
+            if sampled:
+                pending += 1
+                
+                if not self.is_stored(issue):
+                    issue_comments = self.start_comments(issue, index)
             
-            url = comments_url + '?' + urlparse.urlencode(params)
-            res = self.req.send(url)
-            data = res['data']
-            next_page = res['next_page']
-            self.set_rate_limit(res['calls'])
+            entries.append((index, issue, sampled, issue_comments))
+            index += 1
             
-            for comment in data:
-                issue_comments.append(comment)
+            # Stop sampling after gathering the specified total
+            if self.sample_complete(pending):
+                break
+        
+        return entries
+    
+    # Start fetching comments of sampled issue
+    def start_comments(self, issue, index):
+        issue_comments = list()
+        
+        if issue['comments'] == 0 or self.bulk_comments:
+            return issue_comments
+        
+        if self.comment_pool is not None:
+            return self.comment_pool.submit(self.get_comments, issue['comments_url'], issue_comments, track=False)
+        
+        print('Fetching comments for issue %d (%d)' % (index, issue['number']))
+        self.get_comments(issue['comments_url'], issue_comments)
+        
+        return issue_comments
+    
+    # Check whether issue was stored by an earlier run
+    def is_stored(self, issue):
+        return self.seen is not None and self.seen.seen(issue['id'])
+    
+    # Record issue in seen index
+    def mark_stored(self, issue):
+        if self.seen is not None:
+            self.seen.add(issue['id'])
+    
+    # Hand sampled issues to the buffer in page order, advancing progress only past stored issues
+    def store_issues(self, entries):
+        for index, issue, sampled, issue_comments in entries:
+            if sampled and issue_comments is None:
+                print('Issue %d already stored.' % index)
+            elif sampled:
+                if isinstance(issue_comments, Future):
+                    issue_comments = issue_comments.result()
                 
-            if next_page is not None:
-                self.get_comments(comments_url, issue_comments, next_page)
-        else:
-            self.req.wait()
-            self.get_comments(comments_url, issue_comments, page)
+                issue['issue_comments'] = issue_comments
+                self.mark_stored(issue)
+                self.buffer.add(issue)
+                print('Issue %d collected.' % index)
+            
+            # A checkpoint written by the buffer never covers issues that were not handed to it
+            self.info['issue_number'] = issue['number']
+            self.info['current_index'] = index + 1
+            
+            if sampled:
+                self.info['collected_items'] += 1
     
-    # Retrieve total result count from API
-    def result_count(self, repo):
-        if self.rate_limit('search') > 0:       
-            params = {
-                'q': 'type:issue state:closed created:>=2015-01-01T00:00:00Z repo:' + repo
-            }
+    # Fetch issue comments
+    def get_comments(self, comments_url, issue_comments, page=1, track=True):
+        params = {
+            'per_page': 100,
+            'page': page
+        }
+        
+        separator = '&' if '?' in comments_url else '?'
+        url = comments_url + separator + urlparse.urlencode(params)
+        print('Retrieving comments...')
+        
+        for res in self.req.paginate(url, self.throttle()):
+            if track:
+                self.info['comments_page'] = res['page']
             
-            url = self.req.build('search/issues', params)
-            res = self.req.send(url)
-            items = res['data']['items']
-            self.set_rate_limit(res['calls'], 'search')
+            print('Traversing page %d of comments.' % res['page'])
+            issue_comments.extend(res['data'])
+        
+        return issue_comments
+    
+    # Fetch comments of sampled issues through the repo-wide comments endpoint
+    def harvest_comments(self, repo, since='2015-01-01T00:00:00Z'):
+        self.flush()
+        self.issues.create_index('url')
+        
+        repo_url = self.req.build('repos/' + repo)
+        sampled = set(self.issues.distinct('url', {'repository_url': repo_url, 'comments': {'$gt': 0}}))
+        
+        if not sampled:
+            return
+        
+        params = {
+            'since': since,
+            'sort': 'created',
+            'direction': 'asc',
+            'per_page': 100
+        }
+        
+        url = self.req.build('repos/' + repo + '/issues/comments', params)
+        print('Harvesting comments from %s for %d issues' % (repo, len(sampled)))
+        
+        for res in self.req.paginate(url, self.throttle()):
+            print('Traversing page %d of repo comments.' % res['page'])
             
-            if items:
-                self.info['issue_number'] = items[0]['number']
+            issue_comments = dict()
             
-            return int(res['data']['total_count'])
-        else:
-            self.req.wait()
-            self.result_count(repo)
+            for comment in res['data']:
+                if comment['issue_url'] in sampled:
+                    if self.schema is not None:
+                        comment = self.schema.project_comment(comment)
+                    
+                    issue_comments.setdefault(comment['issue_url'], list()).append(comment)
+            
+            # Comments are replaced by id so re-harvested or edited comments are stored once
+            ops = list()
+            
+            for issue_url, comments in issue_comments.items():
+                ids = [comment['id'] for comment in comments]
+                ops.append(UpdateOne({'url': issue_url}, {'$pull': {'issue_comments': {'id': {'$in': ids}}}}))
+                ops.append(UpdateOne({'url': issue_url}, {'$push': {'issue_comments': {
+                    '$each': comments, '$sort': {'created_at': 1}}}}))
+            
+            if ops:
+                self.issues.bulk_write(ops, ordered=True)
+    
+    # Retrieve total result count from API
+    def result_count(self, repo):
+        params = {
+            'q': 'type:issue state:closed created:>=2015-01-01T00:00:00Z repo:' + repo
+        }
+        
+        self.throttle('search')()
+        
+        url = self.req.build('search/issues', params)
+        res = self.req.send(url)
+        items = res['data']['items']
+        
+        if items:
+            self.info['issue_number'] = items[0]['number']
+        
+        return int(res['data']['total_count'])
+    
+    # Get function which blocks until API calls are available
+    def throttle(self, api_type='core'):
+        def wait():
+            while self.rate_limit(api_type) <= 0:
+                self.req.wait(api_type)
+        
+        return wait
+    
+    # Reset progress for streaming sample of repo without a total count
+    def start_bernoulli_sample(self, sample_percent):
+        self.info['sample_rate'] = sample_percent / 100
+        self.info['repo_sample'] = list()
+        self.info['total_issues'] = 0
+        self.info['collect_total'] = None
+        self.info['issue_number'] = sys.maxsize
+        self.info['current_index'] = 0
+        self.info['collected_items'] = 0
+    
+    # Decide whether issue belongs to sample
+    def in_sample(self, issue, index=None):
+        index = index if index is not None else self.info['current_index']
+        
+        if self.info['collect_total'] is None:
+            # Decision depends only on seed and issue id, so it is stable across restarts
+            key = '%d:%d' % (self.info['sample_seed'], issue['id'])
+            digest = hashlib.sha1(key.encode('utf-8')).digest()
+            
+            return int.from_bytes(digest[:8], 'big') < self.info['sample_rate'] * 2 ** 64
+        
+        return index in self.info['repo_sample']
+    
+    # Check whether sample size has been reached
+    def sample_complete(self, pending=0):
+        if self.info['collect_total'] is None:
+            return False
+        
+        return self.info['collected_items'] + pending >= self.info['collect_total']
     
     # Calculate how many issues are to be extracted
     def calc_total(self, percent, total):
@@ -305,20 +498,13 @@ class GitHubIssueCollector:
     
     # Check current API rate limits
     def rate_limit(self, api_type='core'):        
-        if api_type not in self.calls_left or self.calls_left[api_type] is 0:
-            print('Getting rate limit from API')
-            url = self.req.build('rate_limit')
-            res = self.req.send(url)['data']['resources']
-            
-            remaining = res[api_type]['remaining']
-        else:
-            print('Getting rate limit from response')
-            remaining = int(self.calls_left[api_type])
-            
+        remaining = self.req.rate_limit(api_type)
         print('API calls remaining: %d' % remaining)
         
         return remaining
     
-    # Set API call count
-    def set_rate_limit(self, value, api_type='core'):
-        self.calls_left[api_type] = value
\ No newline at end of file
+    # Print requests sent and calls left per token
+    def print_usage(self):
+        for usage in self.req.token_usage():
+            remaining = usage['remaining'] if usage['remaining'] is not None else -1
+            print('Token %s: %d requests sent, %d calls remaining' % (usage['token'], usage['requests'], remaining))
\ No newline at end of file
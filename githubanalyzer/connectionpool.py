@@ -0,0 +1,103 @@
+import threading
+import http.client as httpclient
+import urllib.error as urlerror
+import urllib.parse as urlparse
+
+class ConnectionPool:
+    
+    def __init__(self, max_idle=10, max_redirects=5):
+        self.max_idle = max_idle
+        self.max_redirects = max_redirects
+        self.idle = dict()
+        self.lock = threading.Lock()
+    
+    # Send HTTP request over a pooled keep-alive connection
+    def request(self, url, method='GET', headers={}, timeout=10):
+        for redirect in range(self.max_redirects + 1):
+            status, res_headers, body = self.send(url, method, headers, timeout)
+            
+            if status in (301, 302, 307, 308) and res_headers.get('Location') is not None:
+                url = urlparse.urljoin(url, res_headers.get('Location'))
+                continue
+            
+            if status >= 400:
+                raise urlerror.HTTPError(url, status, 'HTTP Error %d' % status, res_headers, None)
+            
+            return status, res_headers, body
+        
+        raise urlerror.URLError('Too many redirects: %s' % url)
+    
+    # Send request, retrying once if an idle connection was closed by the server
+    def send(self, url, method, headers, timeout):
+        parts = urlparse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        
+        if parts.query:
+            path += '?' + parts.query
+        
+        for attempt in range(2):
+            conn, reused = self.acquire(key, timeout)
+            
+            try:
+                conn.request(method, path, headers=headers)
+                res = conn.getresponse()
+                body = res.read()
+            except (httpclient.HTTPException, ConnectionError):
+                conn.close()
+                
+                if reused and attempt == 0:
+                    continue
+                
+                raise
+            except Exception:
+                conn.close()
+                raise
+            
+            if res.will_close:
+                conn.close()
+            else:
+                self.release(key, conn)
+            
+            return res.status, res.msg, body
+    
+    # Get an idle connection for host or open a new one
+    def acquire(self, key, timeout):
+        with self.lock:
+            conns = self.idle.get(key)
+            
+            if conns:
+                conn = conns.pop()
+                conn.timeout = timeout
+                
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                
+                return conn, True
+        
+        scheme, netloc = key
+        
+        if scheme == 'https':
+            return httpclient.HTTPSConnection(netloc, timeout=timeout), False
+        
+        return httpclient.HTTPConnection(netloc, timeout=timeout), False
+    
+    # Return connection to pool
+    def release(self, key, conn):
+        with self.lock:
+            conns = self.idle.setdefault(key, list())
+            
+            if len(conns) < self.max_idle:
+                conns.append(conn)
+                return
+        
+        conn.close()
+    
+    # Close all idle connections
+    def close(self):
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            
+            self.idle = dict()
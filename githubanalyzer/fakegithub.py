@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+import socketserver
+import urllib.request as urlreq
+import urllib.error as urlerror
+import urllib.parse as urlparse
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+class ThreadingServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class FakeGitHubServer:
+
+    def __init__(self, host='127.0.0.1', port=0, num_repos=3, issues_per_repo=500, max_comments=6,
+                 pull_request_ratio=0.1, latency=0, error_rate=0, core_limit=5000, search_limit=30,
+                 reset_window=3600, record_dir=None, replay_dir=None, upstream='https://api.github.com', seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.limits = {'core': core_limit, 'search': search_limit}
+        self.reset_window = reset_window
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.upstream = upstream
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset_counters()
+        
+        if replay_dir is None and record_dir is None:
+            self.generate(num_repos, issues_per_repo, max_comments, pull_request_ratio)
+    
+    # Get base URL of running server
+    @property
+    def url(self):
+        return 'http://%s:%d/' % (self.host, self.port)
+    
+    # Start serving in a background thread
+    def start(self):
+        server = self
+        
+        class Handler(FakeGitHubHandler):
+            github = server
+        
+        self.httpd = ThreadingServer((self.host, self.port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        
+        return self
+    
+    # Stop server
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    # Reset request counters and rate limits
+    def reset_counters(self):
+        with self.lock:
+            self.calls = dict()
+            self.not_modified = 0
+            self.errors = 0
+            self.remaining = dict(self.limits)
+            self.reset_at = int(time.time()) + self.reset_window
+    
+    # Get total number of API calls served
+    def total_calls(self):
+        return sum(self.calls.values())
+    
+    # Generate synthetic repos, issues and comments
+    def generate(self, num_repos, issues_per_repo, max_comments, pull_request_ratio):
+        self.repos = list()
+        self.issues = dict()
+        self.comments = dict()
+        comment_id = 1
+        issue_id = 1
+        
+        for index in range(num_repos):
+            name = 'owner%d/repo%d' % (index, index)
+            self.repos.append({
+                'id': index + 1,
+                'full_name': name,
+                'stargazers_count': 100000 - index
+            })
+            
+            issues = list()
+            
+            for number in range(1, issues_per_repo + 1):
+                created = 1420070400 + number * 3600
+                num_comments = self.random.randint(0, max_comments)
+                
+                issue = {
+                    'id': issue_id,
+                    'number': number,
+                    'title': 'Issue %d in %s' % (number, name),
+                    'body': 'The component fails when it is used with the latest version %d.' % number,
+                    'state': 'closed',
+                    'comments': num_comments,
+                    'created_at': self.timestamp(created),
+                    'updated_at': self.timestamp(created + self.random.randint(0, 86400 * 30)),
+                    'user': {'login': 'user%d' % self.random.randint(1, 1000)},
+                    'labels': list()
+                }
+                
+                if self.random.random() < pull_request_ratio:
+                    issue['pull_request'] = {'url': 'pulls/%d' % number}
+                
+                comments = list()
+                
+                for position in range(num_comments):
+                    comments.append({
+                        'id': comment_id,
+                        'body': 'Upgrading to version %d fixed the problem for me.' % position,
+                        'created_at': self.timestamp(created + (position + 1) * 600),
+                        'updated_at': self.timestamp(created + (position + 1) * 600),
+                        'reactions': {
+                            'url': '', 'total_count': 0, '+1': self.random.randint(0, 5), '-1': 0,
+                            'laugh': 0, 'hooray': 0, 'confused': 0, 'heart': self.random.randint(0, 2)
+                        }
+                    })
+                    comment_id += 1
+                
+                issues.append(issue)
+                self.comments[(name, number)] = comments
+                issue_id += 1
+            
+            self.issues[name] = issues
+    
+    # Format UNIX time as ISO 8601
+    def timestamp(self, seconds):
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+    
+    # Add URLs pointing at this server to issue
+    def issue_payload(self, repo, issue):
+        api = self.url + 'repos/' + repo
+        
+        return dict(issue,
+                    url='%s/issues/%d' % (api, issue['number']),
+                    repository_url=api,
+                    comments_url='%s/issues/%d/comments' % (api, issue['number']),
+                    html_url='https://github.com/%s/issues/%d' % (repo, issue['number']))
+    
+    # Add URLs pointing at this server to comment
+    def comment_payload(self, repo, number, comment):
+        api = self.url + 'repos/' + repo
+        
+        return dict(comment,
+                    issue_url='%s/issues/%d' % (api, number),
+                    html_url='https://github.com/%s/issues/%d#issuecomment-%d' % (repo, number, comment['id']))
+    
+    # Route request path to synthetic data
+    def route(self, path, params):
+        parts = path.strip('/').split('/')
+        
+        if path == '/rate_limit':
+            return 'rate_limit', self.rate_limit_payload()
+        
+        if path == '/search/repositories':
+            return 'search', self.search_results(self.repos)
+        
+        if path == '/search/issues':
+            query = dict(term.split(':', 1) for term in params.get('q', '').split(' ') if ':' in term)
+            issues = [self.issue_payload(query['repo'], issue) for issue in self.issues.get(query.get('repo'), list())
+                      if 'pull_request' not in issue]
+            issues.sort(key=lambda issue: issue['created_at'], reverse=True)
+            
+            return 'search', self.search_results(issues)
+        
+        if len(parts) == 4 and parts[0] == 'repos' and parts[3] == 'issues':
+            repo = parts[1] + '/' + parts[2]
+            issues = [self.issue_payload(repo, issue) for issue in self.issues.get(repo, list())
+                      if issue['updated_at'] >= params.get('since', '')]
+            
+            return 'core', self.sort(issues, params)
+        
+        if len(parts) == 5 and parts[0] == 'repos' and parts[3:] == ['issues', 'comments']:
+            repo = parts[1] + '/' + parts[2]
+            comments = list()
+            
+            for issue in self.issues.get(repo, list()):
+                comments.extend(self.comment_payload(repo, issue['number'], comment) for comment in self.comments[(repo, issue['number'])]
+                                if comment['updated_at'] >= params.get('since', ''))
+            
+            return 'core', self.sort(comments, params)
+        
+        if len(parts) == 6 and parts[0] == 'repos' and parts[5] == 'comments':
+            repo = parts[1] + '/' + parts[2]
+            number = int(parts[4])
+            comments = [self.comment_payload(repo, number, comment) for comment in self.comments.get((repo, number), list())
+                        if comment['updated_at'] >= params.get('since', '')]
+            
+            return 'core', comments
+        
+        return None, None
+    
+    # Sort items according to request parameters
+    def sort(self, items, params):
+        key = 'updated_at' if params.get('sort') == 'updated' else 'created_at'
+        reverse = params.get('direction', 'desc') == 'desc'
+        
+        return sorted(items, key=lambda item: item[key], reverse=reverse)
+    
+    # Wrap items in search response
+    def search_results(self, items):
+        return {'total_count': len(items), 'incomplete_results': False, 'items': items}
+    
+    # Build rate limit status response
+    def rate_limit_payload(self):
+        resources = dict()
+        
+        for resource, limit in self.limits.items():
+            resources[resource] = {
+                'limit': limit,
+                'remaining': self.remaining[resource],
+                'reset': self.reset_at
+            }
+        
+        return {'resources': resources, 'rate': resources['core']}
+    
+    # Take one call from resource budget, False if exhausted
+    def take_call(self, resource):
+        with self.lock:
+            if time.time() >= self.reset_at:
+                self.remaining = dict(self.limits)
+                self.reset_at = int(time.time()) + self.reset_window
+            
+            if resource not in self.remaining:
+                return True
+            
+            if self.remaining[resource] <= 0:
+                return False
+            
+            self.remaining[resource] -= 1
+            
+            return True
+    
+    # Count served call
+    def count(self, resource):
+        with self.lock:
+            self.calls[resource] = self.calls.get(resource, 0) + 1
+    
+    # Get file storing recorded response for request
+    def recording_path(self, directory, path):
+        key = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        
+        return os.path.join(directory, key + '.json')
+    
+    # Proxy request to real API and store response
+    def record(self, path, headers):
+        req_headers = dict((name, value) for name, value in headers.items()
+                           if name in ('Authorization', 'Accept', 'User-Agent'))
+        req = urlreq.Request(self.upstream + path, headers=req_headers)
+        
+        try:
+            res = urlreq.urlopen(req, timeout=30)
+            status, res_headers, body = res.status, res.info(), res.read()
+        except urlerror.HTTPError as e:
+            status, res_headers, body = e.code, e.headers, e.read()
+        
+        body = body.decode('utf-8').replace(self.upstream.rstrip('/') + '/', self.url)
+        
+        recording = {
+            'path': path,
+            'status': status,
+            'headers': dict((name, res_headers.get(name)) for name in ('Link', 'ETag', 'X-RateLimit-Limit', 'X-RateLimit-Remaining',
+                                                                      'X-RateLimit-Reset', 'X-RateLimit-Resource')
+                            if res_headers.get(name) is not None),
+            'body': body
+        }
+        
+        if recording['headers'].get('Link'):
+            recording['headers']['Link'] = recording['headers']['Link'].replace(self.upstream.rstrip('/') + '/', self.url)
+        
+        os.makedirs(self.record_dir, exist_ok=True)
+        
+        with open(self.recording_path(self.record_dir, path), 'w', encoding='utf-8') as f:
+            json.dump(recording, f)
+        
+        return recording
+    
+    # Load recorded response for request
+    def replay(self, path):
+        try:
+            with open(self.recording_path(self.replay_dir, path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    github = None
+    
+    # Serve GET request
+    def do_GET(self):
+        github = self.github
+        
+        if github.latency:
+            time.sleep(github.latency)
+        
+        if github.error_rate and github.random.random() < github.error_rate:
+            with github.lock:
+                github.errors += 1
+            
+            return self.respond(502, {'message': 'Server Error'})
+        
+        if github.record_dir is not None or github.replay_dir is not None:
+            return self.serve_recording()
+        
+        parts = urlparse.urlsplit(self.path)
+        params = dict(urlparse.parse_qsl(parts.query))
+        resource, data = github.route(parts.path, params)
+        
+        if data is None:
+            return self.respond(404, {'message': 'Not Found'})
+        
+        if resource != 'rate_limit' and not github.take_call(resource):
+            return self.respond(403, {'message': 'API rate limit exceeded'}, resource=resource)
+        
+        headers = dict()
+        
+        if isinstance(data, list):
+            data, headers['Link'] = self.paginate(parts.path, params, data)
+        elif 'items' in data:
+            data['items'], headers['Link'] = self.paginate(parts.path, params, data['items'])
+        
+        body = json.dumps(data).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        
+        # Conditional requests are not counted against the rate limit
+        if self.headers.get('If-None-Match') == etag:
+            if resource != 'rate_limit':
+                with github.lock:
+                    github.remaining[resource] += 1
+                    github.not_modified += 1
+            
+            return self.respond(304, None, resource=resource, headers={'ETag': etag})
+        
+        github.count(resource)
+        headers['ETag'] = etag
+        
+        self.respond(200, body, resource=resource, headers=headers)
+    
+    # Serve recorded or freshly recorded response
+    def serve_recording(self):
+        github = self.github
+        
+        if github.replay_dir is not None:
+            recording = github.replay(self.path)
+        else:
+            recording = github.record(self.path, self.headers)
+        
+        if recording is None:
+            return self.respond(404, {'message': 'Not recorded'})
+        
+        github.count('replay')
+        
+        self.respond(recording['status'], recording['body'].encode('utf-8'), headers=recording['headers'])
+    
+    # Slice page of items and build Link header
+    def paginate(self, path, params, items):
+        per_page = min(int(params.get('per_page', 30)), 100)
+        page = int(params.get('page', 1))
+        last = max(1, (len(items) + per_page - 1) // per_page)
+        links = list()
+        
+        def link(index, rel):
+            query = urlparse.urlencode(dict(params, page=index))
+            
+            return '<%s%s?%s>; rel="%s"' % (self.github.url, path.lstrip('/'), query, rel)
+        
+        if page < last:
+            links.append(link(page + 1, 'next'))
+            links.append(link(last, 'last'))
+        
+        if page > 1:
+            links.append(link(1, 'first'))
+            links.append(link(page - 1, 'prev'))
+        
+        return items[(page - 1) * per_page:page * per_page], ', '.join(links) or None
+    
+    # Write response with rate limit headers
+    def respond(self, status, data, resource=None, headers={}):
+        github = self.github
+        body = data if isinstance(data, bytes) or data is None else json.dumps(data).encode('utf-8')
+        body = body or b''
+        
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        
+        if resource in github.limits:
+            self.send_header('X-RateLimit-Limit', str(github.limits[resource]))
+            self.send_header('X-RateLimit-Remaining', str(github.remaining[resource]))
+            self.send_header('X-RateLimit-Reset', str(github.reset_at))
+            self.send_header('X-RateLimit-Resource', resource)
+        
+        for name, value in headers.items():
+            if value is not None:
+                self.send_header(name, value)
+        
+        self.end_headers()
+        self.wfile.write(body)
+    
+    # Silence request logging
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,53 @@
+import json
+import zlib
+from bson.binary import Binary
+
+ISSUE_FIELDS = ['id', 'number', 'title', 'body', 'comments', 'html_url', 'url', 'repository_url', 
+                'created_at', 'updated_at']
+COMMENT_FIELDS = ['id', 'body', 'html_url', 'issue_url', 'created_at', 'updated_at', 'reactions']
+REACTIONS = ['+1', '-1', 'laugh', 'hooray', 'confused', 'heart']
+
+class IngestSchema:
+    
+    def __init__(self, issue_fields=ISSUE_FIELDS, comment_fields=COMMENT_FIELDS, raw_collection=None):
+        self.issue_fields = issue_fields
+        self.comment_fields = comment_fields
+        self.raw_collection = raw_collection
+    
+    # Keep only issue fields used by the pipeline
+    def project(self, issue):
+        doc = dict((field, issue[field]) for field in self.issue_fields if field in issue)
+        doc['issue_comments'] = [self.project_comment(comment) for comment in issue.get('issue_comments', list())]
+        
+        return doc
+    
+    # Keep only comment fields used by the pipeline
+    def project_comment(self, comment):
+        doc = dict((field, comment[field]) for field in self.comment_fields if field in comment)
+        
+        if 'reactions' in doc:
+            doc['reactions'] = self.flatten_reactions(doc['reactions'])
+        
+        return doc
+    
+    # Reduce reactions object to integer counts
+    def flatten_reactions(self, reactions):
+        return dict((name, int(reactions.get(name, 0))) for name in REACTIONS)
+    
+    # Get field projection for reading stored issues
+    def fields(self):
+        fields = dict((field, 1) for field in self.issue_fields)
+        fields.update(('issue_comments.' + field, 1) for field in self.comment_fields)
+        fields['_id'] = 0
+        
+        return fields
+    
+    # Compress raw issue payload
+    def compress(self, issue):
+        payload = json.dumps(issue, default=str, separators=(',', ':')).encode('utf-8')
+        
+        return {'id': issue['id'], 'payload': Binary(zlib.compress(payload))}
+    
+    # Decompress raw issue payload
+    def decompress(self, doc):
+        return json.loads(zlib.decompress(doc['payload']).decode('utf-8'))
@@ -0,0 +1,147 @@
+import hashlib
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+class MinHasher:
+
+    def __init__(self, num_perm=128, shingle_size=3, seed=1):
+        rand = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rand.randint(1, 1 << 31, size=(num_perm, 1)).astype(np.uint64)
+        self.b = rand.randint(0, 1 << 31, size=(num_perm, 1)).astype(np.uint64)
+    
+    # Split text into overlapping word n-grams
+    def shingles(self, text):
+        words = text.lower().split()
+        k = self.shingle_size
+        
+        if len(words) <= k:
+            return {' '.join(words)}
+        
+        return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    
+    # Hash shingles to 32 bit integers
+    def hash_shingles(self, shingles):
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'big') for s in shingles]
+        
+        return np.array(hashes, dtype=np.uint64)
+    
+    # Get MinHash signature of text
+    def signature(self, text):
+        hashes = self.hash_shingles(self.shingles(text))
+        permuted = (self.a * hashes + self.b) % MERSENNE_PRIME & MAX_HASH
+        
+        return permuted.min(axis=1).astype(np.uint32)
+    
+    # Estimate Jaccard similarity of two signatures
+    @staticmethod
+    def similarity(sig1, sig2):
+        return float(np.mean(sig1 == sig2))
+
+class LSHIndex:
+
+    def __init__(self, threshold=0.8, num_perm=128, merge_ratio=0.125, min_merge=10000, block_size=16384, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = self.optimal_bands(threshold, num_perm)
+        rand = np.random.RandomState(seed)
+        self.multipliers = rand.randint(1, 1 << 62, size=(self.bands, self.rows)).astype(np.uint64)
+        self.merge_ratio = merge_ratio
+        self.min_merge = min_merge
+        self.block_size = block_size
+        self.blocks = list()
+        self.size = 0
+        
+        # Band hashes of merged documents are kept sorted in flat arrays, recent ones in a dict.
+        # With 128 permutations this takes about 0.75 KB per document, 0.5 KB of it signatures,
+        # so 10 million documents need about 8 GB
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.keys = np.zeros(0, dtype=np.uint32)
+        self.pending = dict()
+        self.pending_size = 0
+    
+    # Choose bands and rows whose S-curve crosses 1/2 closest to threshold
+    @staticmethod
+    def optimal_bands(threshold, num_perm):
+        options = [(b, num_perm // b) for b in range(1, num_perm + 1)]
+        
+        return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+    
+    # Hash each band of signature to a 64 bit integer, collisions are caught by verification
+    def band_keys(self, signature):
+        bands = signature[:self.bands * self.rows].reshape(self.bands, self.rows).astype(np.uint64)
+        
+        return (bands * self.multipliers).sum(axis=1)
+    
+    # Get keys of indexed documents sharing a band with signature
+    def candidates(self, signature, band_keys=None):
+        band_keys = band_keys if band_keys is not None else self.band_keys(signature)
+        start = np.searchsorted(self.hashes, band_keys, side='left')
+        end = np.searchsorted(self.hashes, band_keys, side='right')
+        found = set()
+        
+        for i in np.flatnonzero(end > start):
+            found.update(self.keys[start[i]:end[i]].tolist())
+        
+        for band_key in band_keys.tolist():
+            found.update(self.pending.get(band_key, ()))
+        
+        return found
+    
+    # Check whether a near duplicate of signature is indexed, verifying band collisions
+    def query(self, signature, band_keys=None):
+        found = self.candidates(signature, band_keys)
+        
+        if not found:
+            return False
+        
+        signatures = np.array([self.blocks[key // self.block_size][key % self.block_size] for key in found])
+        similarity = np.mean(signatures == signature, axis=1)
+        
+        return bool(np.any(similarity >= self.threshold))
+    
+    # Add signature to index
+    def insert(self, signature, band_keys=None):
+        key = self.size
+        band_keys = band_keys if band_keys is not None else self.band_keys(signature)
+        
+        for band_key in band_keys.tolist():
+            self.pending.setdefault(band_key, list()).append(key)
+        
+        # Signatures are stored in fixed blocks so growing never copies earlier ones
+        if key % self.block_size == 0:
+            self.blocks.append(np.zeros((self.block_size, self.num_perm), dtype=np.uint32))
+        
+        self.blocks[-1][key % self.block_size] = signature
+        self.size += 1
+        self.pending_size += 1
+        
+        if self.pending_size >= max(self.min_merge, self.merge_ratio * self.size):
+            self.merge()
+    
+    # Move recent band hashes into the sorted arrays
+    def merge(self):
+        items = [(band_key, key) for band_key, keys in self.pending.items() for key in keys]
+        hashes = np.array([item[0] for item in items], dtype=np.uint64)
+        keys = np.array([item[1] for item in items], dtype=np.uint32)
+        order = np.argsort(hashes)
+        positions = np.searchsorted(self.hashes, hashes[order])
+        
+        self.hashes = np.insert(self.hashes, positions, hashes[order])
+        self.keys = np.insert(self.keys, positions, keys[order])
+        self.pending = dict()
+        self.pending_size = 0
+    
+    # Add signature unless a near duplicate is already indexed
+    def add(self, signature):
+        band_keys = self.band_keys(signature)
+        
+        if self.query(signature, band_keys):
+            return False
+        
+        self.insert(signature, band_keys)
+        
+        return True
@@ -34,6 +34,33 @@ class MongoDB:
         
         return col.find({column: { '$in': issue_list}}, fields)
     
+    # Get latest issue update seen in repo
+    def get_watermark(self, repo):
+        res = self.db.watermarks.find_one({'repo': repo})
+        
+        return res['updated_at'] if res is not None else None
+    
+    # Advance latest issue update seen in repo
+    def set_watermark(self, repo, updated_at):
+        self.db.watermarks.update_one({'repo': repo}, {'$max': {'updated_at': updated_at}}, upsert=True)
+    
+    # Get latest update of collected issues in repo
+    def latest_update(self, repo_url):
+        res = self.db.collected.find({'repository_url': repo_url}, {'_id':0, 'updated_at':1})
+        res = list(res.sort('updated_at', -1).limit(1))
+        
+        return res[0]['updated_at'] if res else None
+    
+    # Get names of repos with collected issues
+    def collected_repos(self):
+        urls = self.db.collected.distinct('repository_url')
+        
+        return [url.split('/repos/', 1)[1] for url in urls]
+        
+    # Get ids of issues that were already assigned to clusters
+    def assigned_ids(self):
+        return set(self.db.clusters.distinct('id'))
+        
     # Assign cluster index to issues
     def assign_clusters(self, labels):
         col = self.db.clusters
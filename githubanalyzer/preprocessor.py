@@ -1,14 +1,30 @@
 import re
+from functools import lru_cache
 from nltk.corpus import stopwords
 from nltk.corpus import wordnet
 from nltk.tokenize import word_tokenize
-from nltk import pos_tag
+from nltk.tag import PerceptronTagger
 from nltk.stem import WordNetLemmatizer, SnowballStemmer
 from bs4 import BeautifulSoup
 import pandas as pd
+from multiprocessing import Pool, cpu_count
+
+PROCESSOR = None
+TAGGER = None
 
 class TextPreprocessor:
     
+    URL_REGEX = re.compile(r'(((http|https):\/\/)|www\.)[A-Za-z0-9_?\-./+=#&%]+')
+    EMAIL_REGEX = re.compile(r'[A-Za-z0-9_.]+@[A-Za-z0-9_.]+\.[A-Za-z.]{2,}')
+    DUPLICATE_REGEX = re.compile(r'(.)\1{2,}')
+    
+    def __init__(self, method='lemmatize', cache_size=100000):
+        self.method = method
+        self.stop = frozenset(stopwords.words('english'))
+        self.wnl = WordNetLemmatizer()
+        self.stemmer = SnowballStemmer('english')
+        self.lemma = lru_cache(maxsize=cache_size)(self.wnl.lemmatize)
+    
     # Prepare dataset
     def prepare(self, data, stopwords=list()):
         if(isinstance(data, (list, pd.Series))):
@@ -19,10 +35,50 @@ class TextPreprocessor:
             data = self.tokenize(data)
             data = self.strip_alpha(data)
             data = self.remove_stopwords(data, stopwords)
-            data = self.lemmatize(data)
+            data = self.stem(data) if self.method == 'stem' else self.lemmatize(data)
         
         return data
+    
+    # Prepare list of texts in chunks spread across a process pool
+    def prepare_batch(self, data, processes=None, chunk_size=1000):
+        data = list(data)
+        processes = processes or cpu_count()
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        
+        if processes == 1 or len(chunks) <= 1:
+            prepared = [self.prepare_chunk(chunk) for chunk in chunks]
+        else:
+            with Pool(processes, initializer=init_worker, initargs=(self.method,)) as pool:
+                prepared = pool.map(prepare_chunk, chunks)
+        
+        return [item for chunk in prepared for item in chunk]
+    
+    # Prepare chunk of texts, tagging all of them in a single batch
+    def prepare_chunk(self, chunk):
+        tokens = list()
         
+        for text in chunk:
+            data = self.normalize(text)
+            data = self.strip_all(data)
+            data = self.tokenize(data)
+            data = self.strip_alpha(data)
+            data = self.remove_stopwords(data)
+            tokens.append(data)
+        
+        if self.method == 'stem':
+            return [self.stem(item) for item in tokens]
+        
+        tagged = get_tagger().tag_sents(tokens)
+        
+        return [self.lemmatize_tagged(item) for item in tagged]
+        
+    # Get settings that determine the output of prepare
+    def config(self):
+        return {
+            'stopwords': sorted(self.stop),
+            'method': self.method
+        }
+    
     # Convert text to lowercase
     def normalize(self, text):
         return text.lower()
@@ -33,28 +89,39 @@ class TextPreprocessor:
     
     # Remove most common English words from text
     def remove_stopwords(self, text, stopword_list=list()):
-        stop = set(stopword_list) if stopword_list else set(stopwords.words('english'))
+        stop = set(stopword_list) if stopword_list else self.stop
     
         return [word for word in text if word not in stop]
     
     # Remove word suffixes     
     def stem(self, text):
-        stemmer = SnowballStemmer('english')
-        
-        return [stemmer.stem(word) for word in text]
+        return [self.stemmer.stem(word) for word in text]
     
     # Convert words into their root form    
     def lemmatize(self, text):
-        wnl = WordNetLemmatizer()
-        ds = self.get_word_pos(text)
+        return self.lemmatize_tagged(get_tagger().tag(text))
+    
+    # Convert POS tagged words into their root form
+    def lemmatize_tagged(self, tagged):
+        ds = self.get_word_pos(tagged)
         
-        return [wnl.lemmatize(word[0], pos=word[1]) for word in ds]
+        return [self.lemma(word[0], word[1]) for word in ds]
     
-    # Determine POS for each word             
-    def get_word_pos(self, text):
-        ds = pos_tag(text)
+    # Get hit rate of lemma cache
+    def cache_stats(self):
+        info = self.lemma.cache_info()
+        total = info.hits + info.misses
         
-        return ((word[0], self.get_wordnet_pos(word[1])) for word in ds)
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'hit_rate': info.hits / total if total else 0.0
+        }
+    
+    # Map POS tags of tagged words to WordNet             
+    def get_word_pos(self, tagged):
+        return ((word[0], self.get_wordnet_pos(word[1])) for word in tagged)
     
     # Transform POS tags from one implementation to another
     def get_wordnet_pos(self, treebank_tag):
@@ -72,6 +139,10 @@ class TextPreprocessor:
 
     # Remove HTML tags from text            
     def strip_html(self, text):
+        # Plain text has nothing for the parser to strip
+        if '<' not in text and '&' not in text:
+            return text
+        
         return BeautifulSoup(text, 'lxml').get_text()
         
     # Replace chars in text using regex 
@@ -80,22 +151,15 @@ class TextPreprocessor:
     
     # Remove URL's
     def strip_url(self, text):
-        regex = r'(((http|https):\/\/)|www\.)[A-Za-z0-9_?\-./+=#&%]+'
-        
-        return self.strip_chars(text, regex)
+        return self.URL_REGEX.sub('', text)
     
     # Remove emails
     def strip_email(self, text):
-        regex = r'[A-Za-z0-9_.]+@[A-Za-z0-9_.]+\.[A-Za-z.]{2,}'
-        
-        return self.strip_chars(text, regex)
+        return self.EMAIL_REGEX.sub('', text)
     
     # Remove duplicate characters
     def strip_duplicate(self, text):
-        regex = r'(.)\1{2,}'
-        replace = r'\1'
-        
-        return self.strip_chars(text, regex, replace)
+        return self.DUPLICATE_REGEX.sub(r'\1', text)
 
     # Remove all unwanted characters
     def strip_all(self, text):
@@ -104,4 +168,26 @@ class TextPreprocessor:
         ds = self.strip_email(ds)
         ds = self.strip_duplicate(ds)
         
-        return ds
\ No newline at end of file
+        return ds
+
+# Load tagger once per process
+def get_tagger():
+    global TAGGER
+    
+    if TAGGER is None:
+        TAGGER = PerceptronTagger()
+    
+    return TAGGER
+
+# Load NLTK resources once when a pool worker starts
+def init_worker(method='lemmatize'):
+    global PROCESSOR
+    
+    PROCESSOR = TextPreprocessor(method)
+    stopwords.words('english')
+    wordnet.ensure_loaded()
+    get_tagger()
+
+# Prepare chunk of texts in pool worker
+def prepare_chunk(chunk):
+    return PROCESSOR.prepare_chunk(chunk)
\ No newline at end of file
@@ -0,0 +1,153 @@
+import time
+import threading
+
+class RateLimiter:
+    
+    def __init__(self, pace=True, margin=1):
+        self.pace = pace
+        self.margin = margin
+        self.buckets = dict()
+        self.throttled = 0.0
+        self.lock = threading.Lock()
+    
+    # Get bucket of API resource
+    def bucket(self, resource):
+        if resource not in self.buckets:
+            self.buckets[resource] = {
+                'remaining': None,
+                'reset': None,
+                'retry_at': 0,
+                'next_slot': 0
+            }
+        
+        return self.buckets[resource]
+    
+    # Set remaining calls and reset time of resource
+    def set(self, resource, remaining, reset=None):
+        with self.lock:
+            bucket = self.bucket(resource)
+            bucket['remaining'] = int(remaining)
+            
+            if reset is not None:
+                bucket['reset'] = int(reset)
+    
+    # Update bucket from response headers
+    def update(self, headers, resource='core'):
+        if headers is None:
+            return
+        
+        resource = headers.get('X-RateLimit-Resource') or resource
+        remaining = headers.get('X-RateLimit-Remaining')
+        retry_after = headers.get('Retry-After')
+        
+        if remaining is not None:
+            self.set(resource, remaining, headers.get('X-RateLimit-Reset'))
+        
+        if retry_after is not None:
+            with self.lock:
+                self.bucket(resource)['retry_at'] = time.time() + int(retry_after)
+    
+    # Get remaining calls of resource, None if unknown
+    def remaining(self, resource='core'):
+        with self.lock:
+            bucket = self.bucket(resource)
+            
+            # Budget is replenished once reset time has passed
+            if bucket['reset'] is not None and bucket['reset'] + self.margin <= time.time():
+                bucket['remaining'] = None
+                bucket['reset'] = None
+            
+            return bucket['remaining']
+    
+    # Check whether resource cannot be used until a reset or retry time
+    def exhausted(self, resource='core'):
+        with self.lock:
+            bucket = self.bucket(resource)
+            
+            return bucket['remaining'] == 0 or bucket['retry_at'] > time.time()
+    
+    # Get time at which resource can be used again
+    def available_at(self, resource='core'):
+        with self.lock:
+            bucket = self.bucket(resource)
+            reset = bucket['reset'] + self.margin if bucket['remaining'] == 0 and bucket['reset'] is not None else 0
+            
+            return max(reset, bucket['retry_at'])
+    
+    # Reserve a request slot, returning delay and whether a slot was granted
+    def reserve(self, resource='core'):
+        now = time.time()
+        
+        with self.lock:
+            bucket = self.bucket(resource)
+            
+            if bucket['retry_at'] > now:
+                return bucket['retry_at'] - now, False
+            
+            if bucket['remaining'] is None or bucket['reset'] is None:
+                return 0, True
+            
+            until_reset = bucket['reset'] + self.margin - now
+            
+            if until_reset <= 0:
+                bucket['remaining'] = None
+                bucket['reset'] = None
+                return 0, True
+            
+            if bucket['remaining'] <= 0:
+                return until_reset, False
+            
+            slot = now
+            
+            # Spread remaining calls evenly until reset
+            if self.pace:
+                slot = max(now, bucket['next_slot'])
+                bucket['next_slot'] = slot + until_reset / bucket['remaining']
+            
+            bucket['remaining'] -= 1
+            
+            return slot - now, True
+    
+    # Block until a request to resource may be sent
+    def acquire(self, resource='core'):
+        while True:
+            delay, granted = self.reserve(resource)
+            
+            if delay > 0:
+                self.sleep(delay, verbose=not granted)
+            
+            if granted:
+                return
+    
+    # Block until resource budget is replenished
+    def wait(self, resource='core'):
+        with self.lock:
+            bucket = self.bucket(resource)
+            delay = bucket['retry_at'] - time.time()
+            
+            if bucket['remaining'] == 0:
+                if bucket['reset'] is None:
+                    bucket['remaining'] = None
+                else:
+                    delay = max(delay, bucket['reset'] + self.margin - time.time())
+        
+        if delay > 0:
+            self.sleep(delay)
+    
+    # Sleep and record time lost to throttling
+    def sleep(self, delay, verbose=True):
+        if verbose:
+            print('Waiting %.1f seconds for API rate limit...' % delay)
+        
+        time.sleep(delay)
+        
+        with self.lock:
+            self.throttled += delay
+    
+    # Get throttling statistics
+    def stats(self):
+        with self.lock:
+            return {
+                'throttled': self.throttled,
+                'remaining': dict((resource, bucket['remaining']) for resource, bucket in self.buckets.items())
+            }
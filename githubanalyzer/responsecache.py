@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import threading
+
+class ResponseCache:
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        
+        os.makedirs(directory, exist_ok=True)
+    
+    # Get path of cache file for URL
+    def path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        
+        return os.path.join(self.directory, key + '.json')
+    
+    # Load cached response
+    def get(self, url):
+        try:
+            with open(self.path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    # Store response along with its validators
+    def set(self, url, headers, data):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        
+        if etag is None and last_modified is None:
+            return
+        
+        entry = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'link': headers.get('Link'),
+            'data': data
+        }
+        
+        path = self.path(url)
+        tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        
+        os.replace(tmp_path, path)
+    
+    # Build conditional request headers from cached entry
+    def conditional_headers(self, entry):
+        headers = dict()
+        
+        if entry['etag'] is not None:
+            headers['If-None-Match'] = entry['etag']
+        
+        if entry['last_modified'] is not None:
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        return headers
+    
+    # Count cache hit
+    def hit(self):
+        with self.lock:
+            self.hits += 1
+    
+    # Count cache miss
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+    
+    # Get cache counters
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,81 @@
+import math
+import hashlib
+from pymongo.errors import OperationFailure
+
+class BloomFilter:
+    
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    # Get bit positions of key using double hashing
+    def positions(self, key):
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        
+        return [(h1 + i * h2) % self.size for i in range(self.num_hashes)]
+    
+    # Add key to filter
+    def add(self, key):
+        for pos in self.positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+    
+    # Check whether key may have been added
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self.positions(key))
+
+class SeenIndex:
+    
+    def __init__(self, collection, key='id', capacity=1000000, error_rate=0.001):
+        self.collection = collection
+        self.key = key
+        
+        ensure_unique_index(self.collection, self.key)
+        self.rebuild(capacity, error_rate)
+    
+    # Load stored keys into Bloom filter
+    def rebuild(self, capacity, error_rate):
+        keys = self.collection.find({}, {'_id': 0, self.key: 1})
+        count = self.collection.estimated_document_count()
+        self.bloom = BloomFilter(max(capacity, 2 * count), error_rate)
+        
+        for doc in keys:
+            if self.key in doc:
+                self.bloom.add(doc[self.key])
+        
+        print('Seen index rebuilt with %d stored issues.' % count)
+    
+    # Check whether key is already stored
+    def seen(self, value):
+        if value not in self.bloom:
+            return False
+        
+        # Bloom filter hits may be false positives, confirm with the unique index
+        return self.collection.find_one({self.key: value}, {'_id': 1}) is not None
+    
+    # Record key as stored
+    def add(self, value):
+        self.bloom.add(value)
+
+# Get index on single key of collection, None if the key is not indexed
+def key_index(collection, key):
+    for index in collection.index_information().values():
+        if index['key'] == [(key, 1)]:
+            return index
+    
+    return None
+
+# Create unique index on key if the key is not indexed yet, never altering an existing index
+def ensure_unique_index(collection, key):
+    index = key_index(collection, key)
+    
+    if index is None:
+        try:
+            collection.create_index(key, unique=True)
+        except OperationFailure:
+            print('Collection has duplicate issues, run migrate_collected.py before collecting.')
+            raise
+    elif not index.get('unique'):
+        print('Index on %s is not unique, run migrate_collected.py to remove duplicates.' % key)
\ No newline at end of file
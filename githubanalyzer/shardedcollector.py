@@ -0,0 +1,155 @@
+import os
+import random
+import socket
+import threading
+from githubanalyzer.collector import GitHubIssueCollector
+
+class ShardedGitHubIssueCollector(GitHubIssueCollector):
+
+    def __init__(self, req, mongo, queue, worker=None, max_attempts=5, **kwargs):
+        super().__init__(req, mongo, **kwargs)
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.lease_lost = False
+        self.worker = worker if worker is not None else '%s:%d' % (socket.gethostname(), os.getpid())
+    
+    # Queue repos as work items, splitting huge repos into issue page ranges
+    def enqueue_repos(self, sample_percent=25, seed=None, pages_per_item=50, page=1):
+        seed = seed if seed is not None else random.getrandbits(32)
+        
+        for res in self.req.paginate(self.repos_url(page), self.throttle('search')):
+            print('Queueing page %d of repos.' % res['page'])
+            
+            for repo in res['data']['items']:
+                repo_name = repo['full_name']
+                last_page = self.last_issues_page(repo_name)
+                
+                for first in range(1, last_page + 1, pages_per_item):
+                    last = min(first + pages_per_item - 1, last_page)
+                    payload = {
+                        'repo': repo_name,
+                        'first_page': first,
+                        'last_page': last,
+                        'sample_rate': sample_percent / 100,
+                        'seed': seed
+                    }
+                    
+                    self.queue.enqueue('%s:%d-%d' % (repo_name, first, last), payload)
+                
+                print('Queued %s (%d pages of issues)' % (repo_name, last_page))
+        
+        print('Work queue: %s' % self.queue.stats())
+    
+    # Get number of issue pages of repo
+    def last_issues_page(self, repo):
+        self.throttle()()
+        res = self.req.send(self.issues_url(repo))
+        
+        if res['last_page'] is not None:
+            return res['last_page']
+        
+        return res['page']
+    
+    # Claim and process work items until the queue is empty
+    def work(self):
+        while True:
+            item = self.queue.claim(self.worker)
+            
+            if item is None:
+                print('No work left for %s.' % self.worker)
+                return
+            
+            print('Worker %s claimed %s' % (self.worker, item['key']))
+            
+            try:
+                done = self.collect_leased(item)
+            except Exception as e:
+                print('Work item %s failed.' % item['key'])
+                print(e.args)
+                self.fail(item)
+                continue
+            except BaseException:
+                self.queue.release(item)
+                raise
+            
+            if done:
+                self.queue.complete(item)
+    
+    # Collect work item while its lease is renewed in the background
+    def collect_leased(self, item):
+        stop = threading.Event()
+        keeper = threading.Thread(target=self.keep_lease, args=(item, stop), daemon=True)
+        self.lease_lost = False
+        keeper.start()
+        
+        try:
+            return self.collect_item(item)
+        finally:
+            stop.set()
+            keeper.join()
+    
+    # Renew lease periodically, also while blocked on rate limits or retries
+    def keep_lease(self, item, stop):
+        while not stop.wait(self.queue.lease_time / 3):
+            if not self.queue.heartbeat(item):
+                self.lease_lost = True
+                return
+    
+    # Return failed item to the queue, giving up after too many attempts
+    def fail(self, item):
+        self.flush()
+        
+        if item['attempts'] >= self.max_attempts:
+            print('Giving up on %s after %d attempts.' % (item['key'], item['attempts']))
+            self.queue.fail(item)
+        else:
+            self.queue.release(item)
+    
+    # Collect issues in page range of work item, False if its lease was lost
+    def collect_item(self, item):
+        payload = item['payload']
+        progress = item['progress']
+        repo = payload['repo']
+        
+        self.start_bernoulli_sample(payload['sample_rate'] * 100)
+        self.info['sample_seed'] = payload['seed']
+        self.info['repo_name'] = repo
+        self.info['collected_items'] = progress.get('collected_items', 0)
+        
+        page = progress.get('page', payload['first_page'])
+        pages = self.req.paginate(self.issues_url(repo, page), self.throttle()) if page <= payload['last_page'] else list()
+        
+        for res in pages:
+            self.info['issues_page'] = res['page']
+            print('Traversing page %d of issues from %s.' % (res['page'], repo))
+            
+            for issue in res['data']:
+                if 'pull_request' not in issue and self.in_sample(issue):
+                    self.info['collected_items'] += 1
+                    
+                    if self.is_stored(issue):
+                        continue
+                    
+                    issue['issue_comments'] = list()
+                    
+                    if issue['comments'] > 0:
+                        self.get_comments(issue['comments_url'], issue['issue_comments'])
+                    
+                    self.mark_stored(issue)
+                    self.buffer.add(issue)
+            
+            # Progress is stored only after the page's issues are written
+            self.flush()
+            progress = {'page': res['page'] + 1, 'collected_items': self.info['collected_items']}
+            
+            if self.lease_lost or not self.queue.heartbeat(item, progress):
+                print('Lease on %s lost.' % item['key'])
+                return False
+            
+            if res['page'] >= payload['last_page']:
+                break
+        
+        print('Collected issues from %s: %d' % (item['key'], self.info['collected_items']))
+        self.print_usage()
+        
+        return True
@@ -9,11 +9,11 @@ class SolutionFinder:
     def __init__(self, clusterer, mongo):
         self.clusterer = clusterer
         self.db = mongo
+        self.processor = TextPreprocessor()
     
     # Transform issues into vectors
     def vectorize_data(self, data):
-        processor = TextPreprocessor()
-        processed = processor.prepare(data)
+        processed = self.processor.prepare(data)
         
         if not processed:
             return None
@@ -0,0 +1,43 @@
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+class StreamingTfidfVectorizer:
+
+    def __init__(self, num_features=2 ** 20, stop_words=None, ngram_range=(1,3), sublinear_tf=True):
+        self.hasher = HashingVectorizer(n_features=num_features, stop_words=stop_words,
+                                        ngram_range=ngram_range, alternate_sign=False, norm=None)
+        self.sublinear_tf = sublinear_tf
+        self.doc_freq = np.zeros(num_features, dtype=np.int64)
+        self.num_docs = 0
+    
+    # Update document frequencies with chunk of documents
+    def partial_fit(self, data):
+        counts = self.hasher.transform(data)
+        self.doc_freq += np.bincount(counts.indices, minlength=counts.shape[1])
+        self.num_docs += counts.shape[0]
+        
+        return self
+    
+    # Get smoothed inverse document frequencies seen so far
+    @property
+    def idf_(self):
+        return np.log((1 + self.num_docs) / (1 + self.doc_freq)) + 1
+    
+    # Transform documents to TF-IDF vectors using current frequencies
+    def transform(self, data):
+        tf = self.hasher.transform(data)
+        
+        if self.sublinear_tf:
+            tf.data = np.log(tf.data) + 1
+        
+        tfidf = tf * sparse.diags(self.idf_)
+        
+        return normalize(tfidf, copy=False)
+    
+    # Update frequencies with chunk and transform it
+    def partial_fit_transform(self, data):
+        data = list(data)
+        
+        return self.partial_fit(data).transform(data)
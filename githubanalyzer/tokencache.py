@@ -0,0 +1,103 @@
+import os
+import json
+import sqlite3
+import hashlib
+
+class TokenCache:
+
+    def __init__(self, path, config, max_entries=None, batch_size=500):
+        self.path = path
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.config_hash = hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+        self.hits = 0
+        self.misses = 0
+        
+        directory = os.path.dirname(path)
+        
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, tokens TEXT, used INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS tokens_used ON tokens (used)')
+        self.validate()
+        self.clock = self.db.execute('SELECT COALESCE(MAX(used), 0) FROM tokens').fetchone()[0]
+    
+    # Clear cache if it was built with a different preprocessing config
+    def validate(self):
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'config'").fetchone()
+        
+        if row is not None and row[0] == self.config_hash:
+            return
+        
+        if row is not None:
+            print('Preprocessing config changed, clearing token cache.')
+        
+        self.db.execute('DELETE FROM tokens')
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (self.config_hash,))
+        self.db.commit()
+    
+    # Get cache key of raw text
+    def key(self, text):
+        return hashlib.sha1((self.config_hash + text).encode('utf-8')).hexdigest()
+    
+    # Load cached token lists of texts, keyed by text
+    def get_many(self, texts):
+        keys = {self.key(text): text for text in set(texts)}
+        found = dict()
+        key_list = list(keys)
+        
+        self.clock += 1
+        
+        for i in range(0, len(key_list), self.batch_size):
+            batch = key_list[i:i + self.batch_size]
+            marks = ','.join('?' * len(batch))
+            rows = self.db.execute('SELECT key, tokens FROM tokens WHERE key IN (%s)' % marks, batch)
+            
+            for key, tokens in rows:
+                found[keys[key]] = json.loads(tokens)
+            
+            self.db.execute('UPDATE tokens SET used = ? WHERE key IN (%s)' % marks, [self.clock] + batch)
+        
+        self.db.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        
+        return found
+    
+    # Store token lists of texts
+    def set_many(self, items):
+        self.clock += 1
+        rows = ((self.key(text), json.dumps(tokens), self.clock) for text, tokens in items)
+        
+        self.db.executemany('INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)', rows)
+        self.db.commit()
+        self.evict()
+    
+    # Drop least recently used entries above size limit
+    def evict(self):
+        if self.max_entries is None:
+            return
+        
+        count = self.db.execute('SELECT COUNT(*) FROM tokens').fetchone()[0]
+        
+        if count <= self.max_entries:
+            return
+        
+        self.db.execute('DELETE FROM tokens WHERE key IN (SELECT key FROM tokens ORDER BY used LIMIT ?)',
+                        (count - self.max_entries,))
+        self.db.commit()
+        print('Evicted %d entries from token cache.' % (count - self.max_entries))
+    
+    # Close database
+    def close(self):
+        self.db.close()
+    
+    # Get cache counters
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,69 @@
+import threading
+from githubanalyzer.ratelimiter import RateLimiter
+
+class TokenPool:
+    
+    def __init__(self, tokens, pace=True):
+        self.entries = [{'token': token, 'limiter': RateLimiter(pace=pace), 'requests': 0} for token in tokens]
+        self.lock = threading.Lock()
+    
+    # Choose token with most remaining calls for resource
+    def select(self, resource='core'):
+        def headroom(entry):
+            limiter = entry['limiter']
+            remaining = limiter.remaining(resource)
+            
+            if limiter.exhausted(resource):
+                return (0, -limiter.available_at(resource))
+            
+            # Tokens with unknown budget are tried first to learn their limits
+            return (float('inf') if remaining is None else remaining, 0)
+        
+        entry = max(self.entries, key=headroom)
+        
+        with self.lock:
+            entry['requests'] += 1
+        
+        return entry
+    
+    # Get total remaining calls of resource, None if any token is unknown
+    def remaining(self, resource='core'):
+        total = 0
+        
+        for entry in self.entries:
+            remaining = entry['limiter'].remaining(resource)
+            
+            if remaining is None:
+                return None
+            
+            total += remaining
+        
+        return total
+    
+    # Check whether all tokens are exhausted
+    def exhausted(self, resource='core'):
+        return all(entry['limiter'].exhausted(resource) for entry in self.entries)
+    
+    # Block until the first token becomes available again
+    def wait(self, resource='core'):
+        entry = min(self.entries, key=lambda entry: entry['limiter'].available_at(resource))
+        entry['limiter'].wait(resource)
+    
+    # Get total time lost to throttling
+    def throttled(self):
+        return sum(entry['limiter'].stats()['throttled'] for entry in self.entries)
+    
+    # Get requests sent and calls remaining for each token
+    def usage(self, resource='core'):
+        usage = list()
+        
+        for entry in self.entries:
+            token = entry['token']
+            
+            usage.append({
+                'token': '...' + token[-4:] if token else 'default',
+                'requests': entry['requests'],
+                'remaining': entry['limiter'].remaining(resource)
+            })
+        
+        return usage
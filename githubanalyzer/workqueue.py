@@ -0,0 +1,75 @@
+import time
+from pymongo import ReturnDocument
+
+class WorkQueue:
+    
+    def __init__(self, mongo, name='work_queue', lease_time=300):
+        self.items = mongo.db[name]
+        self.lease_time = lease_time
+        
+        self.items.create_index('key', unique=True)
+        self.items.create_index([('state', 1), ('lease_expires', 1)])
+    
+    # Add work item unless it is already queued
+    def enqueue(self, key, payload):
+        item = {
+            'key': key,
+            'payload': payload,
+            'state': 'pending',
+            'progress': dict(),
+            'worker': None,
+            'lease_expires': 0,
+            'attempts': 0
+        }
+        
+        self.items.update_one({'key': key}, {'$setOnInsert': item}, upsert=True)
+    
+    # Claim a pending item or one held by a worker whose lease expired
+    def claim(self, worker):
+        now = time.time()
+        query = {
+            '$or': [
+                {'state': 'pending'},
+                {'state': 'claimed', 'lease_expires': {'$lt': now}}
+            ]
+        }
+        update = {
+            '$set': {'state': 'claimed', 'worker': worker, 'lease_expires': now + self.lease_time},
+            '$inc': {'attempts': 1}
+        }
+        
+        return self.items.find_one_and_update(query, update, sort=[('lease_expires', 1)], 
+                                              return_document=ReturnDocument.AFTER)
+    
+    # Extend lease and store item progress, False if the lease was lost
+    def heartbeat(self, item, progress=None):
+        update = {'lease_expires': time.time() + self.lease_time}
+        
+        if progress is not None:
+            update['progress'] = progress
+            item['progress'] = progress
+        
+        res = self.items.update_one({'_id': item['_id'], 'worker': item['worker'], 'state': 'claimed'}, {'$set': update})
+        
+        return res.matched_count == 1
+    
+    # Mark item as done
+    def complete(self, item):
+        self.items.update_one({'_id': item['_id'], 'worker': item['worker']}, 
+                              {'$set': {'state': 'done', 'lease_expires': 0}})
+    
+    # Return item to queue so another worker can claim it
+    def release(self, item):
+        self.items.update_one({'_id': item['_id'], 'worker': item['worker']}, 
+                              {'$set': {'state': 'pending', 'worker': None, 'lease_expires': 0}})
+    
+    # Mark item as failed so it is not claimed again
+    def fail(self, item):
+        self.items.update_one({'_id': item['_id'], 'worker': item['worker']}, 
+                              {'$set': {'state': 'failed', 'lease_expires': 0}})
+    
+    # Get number of items in each state
+    def stats(self):
+        res = self.items.aggregate([{'$group': {'_id': '$state', 'count': {'$sum': 1}}}])
+        
+        return dict((item['_id'], item['count']) for item in res)
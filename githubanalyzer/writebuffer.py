@@ -0,0 +1,57 @@
+import time
+from pymongo import ReplaceOne
+from githubanalyzer.seenindex import ensure_unique_index
+
+class WriteBuffer:
+    
+    def __init__(self, collection, checkpoint=None, max_size=500, max_wait=30, key='id', schema=None):
+        self.collection = collection
+        self.checkpoint = checkpoint
+        self.schema = schema
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.key = key
+        self.docs = list()
+        self.last_flush = time.time()
+        
+        ensure_unique_index(self.collection, key)
+        
+        if schema is not None and schema.raw_collection is not None:
+            schema.raw_collection.create_index(key)
+    
+    # Add document to buffer, flushing when full or stale
+    def add(self, doc):
+        self.docs.append(doc)
+        
+        if len(self.docs) >= self.max_size or time.time() - self.last_flush >= self.max_wait:
+            self.flush()
+    
+    # Add documents to buffer together, flushing at most once
+    def extend(self, docs):
+        self.docs.extend(docs)
+        
+        if len(self.docs) >= self.max_size or time.time() - self.last_flush >= self.max_wait:
+            self.flush()
+    
+    # Upsert buffered documents, then save progress
+    def flush(self):
+        if self.docs:
+            docs = self.docs
+            
+            if self.schema is not None:
+                if self.schema.raw_collection is not None:
+                    raw = [self.schema.compress(doc) for doc in docs]
+                    ops = [ReplaceOne({self.key: doc[self.key]}, doc, upsert=True) for doc in raw]
+                    self.schema.raw_collection.bulk_write(ops, ordered=False)
+                
+                docs = [self.schema.project(doc) for doc in docs]
+            
+            ops = [ReplaceOne({self.key: doc[self.key]}, doc, upsert=True) for doc in docs]
+            self.collection.bulk_write(ops, ordered=False)
+            self.docs = list()
+        
+        # Progress is only saved once the documents it covers are stored
+        if self.checkpoint is not None:
+            self.checkpoint()
+        
+        self.last_flush = time.time()
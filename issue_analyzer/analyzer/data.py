@@ -12,6 +12,10 @@ class IssueAnalyzer:
 		self.db = MongoDB('github')
 		self.finder = SolutionFinder(self.clusterer, self.db)
 
+		# Similarity search needs the scaled features and hierarchy of the full pipeline
+		if self.clusterer.is_streaming():
+			raise ValueError('Model was fitted by the streaming pipeline, re-run feature extraction with STREAMING = False.')
+
 	# Transform issue into vector
 	def transform(self, text):
 		vector = self.finder.vectorize_data(text)
@@ -0,0 +1,72 @@
+import pandas as pd
+from sklearn.externals import joblib
+from githubanalyzer.mongodb import MongoDB
+from data_preprocessing import prepare_text
+
+# Constants
+FILE_PATH = '../data/'
+CLUSTER_FILE = FILE_PATH + 'issue_clusters.json'
+CLUSTERING_MODEL_FILE = FILE_PATH + 'clustering_model.pkl'
+MAX_ADDED = 0.2
+MAX_DISTANCE = 1.5
+MAX_NULL = 0.1
+BATCH_SIZE = 10000
+
+# Assign newly cleaned issues to the existing model
+def process_data():
+    clusterer = joblib.load(CLUSTERING_MODEL_FILE)
+    mongo = MongoDB('github')
+    
+    if clusterer.is_streaming():
+        print('Model was fitted by the streaming pipeline, re-run feature extraction to assign new issues.')
+        return
+    
+    # Null issues are remembered so they are not retried, those left out of the fit do not count as null
+    clusterer.init_drift()
+    assigned = mongo.assigned_ids() | clusterer.drift['null'] | clusterer.drift.get('excluded', set())
+    ids = [issue['id'] for issue in mongo.get_all('issues', {'_id':0, 'id':1}) if issue['id'] not in assigned]
+    
+    if not ids:
+        print('No new issues to assign.')
+        return
+    
+    # Only the fields used for features are loaded, in batches to keep the $in queries small
+    issues = list()
+    
+    for i in range(0, len(ids), BATCH_SIZE):
+        issues.extend(mongo.get_issues_in_list(ids[i:i + BATCH_SIZE], {'_id':0, 'id':1, 'title':1}))
+    
+    df = pd.DataFrame(issues)
+    
+    # Titles left empty by preprocessing end up as null vectors
+    df['title'] = prepare_text(df['title'])
+    
+    features = clusterer.vectorize(df['title'])
+    not_null = clusterer.not_null(features)
+    clusterer.add_nulls(df['id'][~not_null])
+    
+    df = df[not_null]
+    features = features[not_null]
+    
+    if not df.empty:
+        assignment = clusterer.add_documents(features)
+        
+        mongo.save('processed', df)
+        
+        df = df.filter(items=['id'])
+        df.loc[:, 'cluster_index'] = [int(path[0]) for path in assignment]
+        mongo.save('clusters', df, needs_conversion=True)
+        
+        clusters = pd.concat([pd.read_json(CLUSTER_FILE), df])
+        clusters.to_json(CLUSTER_FILE, orient='records')
+    
+    clusterer.save(CLUSTERING_MODEL_FILE)
+    print('Assigned issues: %d' % len(df))
+    print('Drift: %s' % clusterer.drift_metrics())
+    
+    if clusterer.needs_refit(MAX_ADDED, MAX_DISTANCE, MAX_NULL):
+        print('Model has drifted, re-run the full pipeline to refit it.')
+
+# Run application
+if __name__ == '__main__':
+    process_data()
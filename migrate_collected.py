@@ -0,0 +1,43 @@
+from githubanalyzer.mongodb import MongoDB
+from githubanalyzer.seenindex import key_index
+
+# Constants
+COLLECTION = 'collected'
+KEY = 'id'
+
+# Delete all but the earliest stored copy of each key
+def remove_duplicates(collection, key):
+    groups = collection.aggregate([
+        {'$sort': {'_id': 1}},
+        {'$group': {'_id': '$' + key, 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    removed = 0
+    
+    for group in groups:
+        removed += collection.delete_many({'_id': {'$in': group['ids'][1:]}}).deleted_count
+    
+    return removed
+
+# Replace non-unique key index with unique one, run once with no collectors running
+def migrate():
+    mongo = MongoDB('github')
+    collection = mongo.db[COLLECTION]
+    index = key_index(collection, KEY)
+    
+    if index is not None and index.get('unique'):
+        print('Index on %s is already unique.' % KEY)
+        return
+    
+    removed = remove_duplicates(collection, KEY)
+    print('Removed duplicate issues: %d' % removed)
+    
+    if index is not None:
+        collection.drop_index([(KEY, 1)])
+    
+    collection.create_index(KEY, unique=True)
+    print('Created unique index on %s.' % KEY)
+
+# Run application
+if __name__ == '__main__':
+    migrate()
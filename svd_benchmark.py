@@ -0,0 +1,54 @@
+import time
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+from githubanalyzer.blocksvd import BlockRandomizedSVD
+
+# Constants
+NUM_DOCS = 200000
+NUM_FEATURES = 50000
+NUM_TOPICS = 200
+DENSITY = 0.0005
+NUM_DIMENSIONS = 100
+BLOCK_SIZE = 10000
+RANDOM_SEED = 42
+
+# Generate sparse TF-IDF-like matrix with latent topic structure
+def generate_features(num_docs, num_features):
+    rand = np.random.RandomState(RANDOM_SEED)
+    topics = sparse.random(NUM_TOPICS, num_features, density=0.01, random_state=rand, format='csr')
+    weights = sparse.random(num_docs, NUM_TOPICS, density=0.02, random_state=rand, format='csr')
+    noise = sparse.random(num_docs, num_features, density=DENSITY, random_state=rand, format='csr')
+    
+    return normalize(weights.dot(topics) + noise)
+
+# Time function call
+def timed(func, *args, **kwargs):
+    start = time.time()
+    res = func(*args, **kwargs)
+    
+    return res, time.time() - start
+
+# Compare arpack with block randomized SVD, cold and warm started
+def run_benchmark():
+    features = generate_features(NUM_DOCS, NUM_FEATURES)
+    print('Features: %d x %d (%d non-zero)' % (features.shape + (features.nnz,)))
+    
+    arpack = TruncatedSVD(n_components=NUM_DIMENSIONS, algorithm='arpack', random_state=RANDOM_SEED)
+    res, arpack_time = timed(arpack.fit_transform, features)
+    
+    block = BlockRandomizedSVD(NUM_DIMENSIONS, block_size=BLOCK_SIZE, random_state=RANDOM_SEED)
+    res, block_time = timed(block.fit_transform, features)
+    
+    # Warm start from the previous components with fewer iterations
+    warm = BlockRandomizedSVD(NUM_DIMENSIONS, n_iter=1, block_size=BLOCK_SIZE, random_state=RANDOM_SEED)
+    res, warm_time = timed(warm.fit_transform, features, block.components_)
+    
+    for name, model, fit_time in [('arpack', arpack, arpack_time), ('block', block, block_time),
+                                  ('block (warm start)', warm, warm_time)]:
+        print('%s: %.2f s, explained variance %.4f' % (name, fit_time, model.explained_variance_ratio_.sum()))
+
+# Run application
+if __name__ == '__main__':
+    run_benchmark()